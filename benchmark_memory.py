@@ -0,0 +1,75 @@
+"""对比字典行与 LoginEvent + 字符串池两种存储方式的单条事件内存占用
+
+用法: python benchmark_memory.py [事件数量]
+"""
+import sys
+import gc
+import tracemalloc
+
+from event_store import SECURITY_EVENTS, LoginEventFactory
+
+
+LOGIN_RESULTS = {4624: "成功", 4625: "失败", 4648: "明文尝试", 4672: "特权登录"}
+
+
+def generate_raw_fields(count):
+    """生成模拟的解析结果
+
+    时间、IP、用户名和详情每条都是新分配的字符串（与解析XML时一致）；
+    事件类型和登录结果与实际解析代码一样直接引用共享的标签
+    """
+    event_ids = list(SECURITY_EVENTS)
+    for i in range(count):
+        event_id = event_ids[i % 4]
+        yield (
+            f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}.{i % 1000000:06d}Z",
+            event_id,
+            SECURITY_EVENTS[event_id],
+            f"10.0.{i % 7}.{i % 200}",
+            f"user{i % 500}",
+            LOGIN_RESULTS[event_id],
+            f"登录类型: {3 if i % 2 else 10}, 进程: -"
+        )
+
+
+def build_dict_rows(count):
+    rows = []
+    for time, event_id, event_type, ip, username, result, details in generate_raw_fields(count):
+        rows.append({
+            '时间': time,
+            '事件ID': event_id,
+            '事件类型': event_type,
+            'IP地址': ip,
+            '用户名': username,
+            '登录结果': result,
+            '详情': details
+        })
+    return rows
+
+
+def build_login_events(count):
+    factory = LoginEventFactory()
+    return [factory.create(*fields) for fields in generate_raw_fields(count)], factory
+
+
+def measure(builder, count):
+    gc.collect()
+    tracemalloc.start()
+    result = builder(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return current / count
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    dict_bytes = measure(build_dict_rows, count)
+    slots_bytes = measure(build_login_events, count)
+
+    print(f"事件数量: {count}")
+    print(f"字典行:             {dict_bytes:8.1f} 字节/条")
+    print(f"LoginEvent+字符串池: {slots_bytes:8.1f} 字节/条")
+    print(f"节省:               {(1 - slots_bytes / dict_bytes) * 100:8.1f}%")
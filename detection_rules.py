@@ -0,0 +1,340 @@
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+
+# 风险等级排序（数值越大越严重）
+RISK_ORDER = {"警告": 1, "可疑": 2, "高危": 3}
+
+# 不作为目标用户名统计的常见系统账户
+SYSTEM_ACCOUNTS = ['system', 'administrator', 'guest', 'defaultaccount']
+
+# 特权登录中由系统服务产生、不需要告警的账户
+SERVICE_ACCOUNTS = ['system', 'local service', 'network service']
+
+
+def parse_event_time(text):
+    """把事件时间字符串解析为datetime，无法解析时返回None
+
+    EVTX导入的时间为 SystemTime（如 2024-01-01 08:00:00.123456 或带Z的ISO格式），
+    本地日志为 TimeGenerated.Format() 的结果
+    """
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for fmt in ('%c', '%a %b %d %H:%M:%S %Y', '%Y/%m/%d %H:%M:%S'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def iter_chronological(logs):
+    """按时间先后顺序遍历日志
+
+    循环覆盖过的EVTX文件、多个文件拼接的结果在物理顺序上都不一定按时间排列，
+    因此按解析出的时间做稳定排序，无法解析时间的事件保持原来的位置。
+    本地日志是倒序读取的（最新的在前），首条晚于末条时先整体反转，
+    使时间相同的事件也按发生先后处理
+    """
+    logs = list(logs)
+    times = [parse_event_time(log['时间']) for log in logs]
+    if len(logs) > 1 and times[0] is not None and times[-1] is not None and times[0] > times[-1]:
+        logs.reverse()
+        times.reverse()
+
+    positions = [i for i, event_time in enumerate(times) if event_time is not None]
+    ordered = list(logs)
+    for position, index in zip(positions, sorted(positions, key=times.__getitem__)):
+        ordered[position] = logs[index]
+    return iter(ordered)
+
+
+class Finding:
+    """一条检测结果，字段与爆破检测结果表格的列一一对应"""
+    __slots__ = ('source', 'count', 'time_range', 'risk', 'usernames', 'target_usernames', 'rule')
+
+    def __init__(self, source, count, time_range, risk, usernames, target_usernames, rule):
+        self.source = source
+        self.count = count
+        self.time_range = time_range
+        self.risk = risk
+        self.usernames = usernames
+        self.target_usernames = target_usernames
+        self.rule = rule
+
+    def values(self):
+        """返回插入表格用的行数据"""
+        return (
+            self.source,
+            self.count,
+            self.time_range,
+            self.risk,
+            ", ".join(self.usernames),
+            ", ".join(self.target_usernames),
+            self.rule
+        )
+
+
+class SourceState:
+    """按来源IP分组的共享统计状态，所有规则共用同一份"""
+    __slots__ = ('source', 'failure_count', 'usernames', 'target_usernames',
+                 'first_time', 'last_time', 'failure_times',
+                 'pending_failures', 'pending_first_time')
+
+    def __init__(self, source):
+        self.source = source
+        self.failure_count = 0
+        # 用户名 -> 失败次数
+        self.usernames = {}
+        self.target_usernames = set()
+        self.first_time = None
+        self.last_time = None
+        # 可解析的失败时间，按读取顺序排列
+        self.failure_times = []
+        # 上一次登录成功之后累计的失败次数
+        self.pending_failures = 0
+        self.pending_first_time = None
+
+    def record_failure(self, event):
+        username = event['用户名']
+        time_str = event['时间']
+
+        if self.first_time is None:
+            self.first_time = time_str
+        self.last_time = time_str
+
+        self.failure_count += 1
+        self.usernames[username] = self.usernames.get(username, 0) + 1
+        if username.lower() not in SYSTEM_ACCOUNTS:
+            self.target_usernames.add(username)
+
+        event_time = parse_event_time(time_str)
+        if event_time is not None:
+            self.failure_times.append(event_time)
+
+        if self.pending_failures == 0:
+            self.pending_first_time = time_str
+        self.pending_failures += 1
+
+    def record_success(self, event):
+        self.pending_failures = 0
+        self.pending_first_time = None
+
+    def time_range(self):
+        return f"{self.first_time} 至 {self.last_time}"
+
+
+class DetectionRule:
+    """检测规则基类
+
+    event_ids 中列出的事件会在单次遍历中逐条交给 on_event 处理，
+    其余规则只在 finalize 时基于共享的分组统计计算结果，
+    因此增加规则不会增加对日志的遍历次数
+    """
+    name = ""
+    event_ids = ()
+
+    def on_event(self, event, state, engine):
+        pass
+
+    def finalize(self, engine):
+        return []
+
+
+class ThresholdRule(DetectionRule):
+    """同一IP失败登录次数达到阈值"""
+    name = "失败次数阈值"
+
+    def __init__(self, warning=5, suspicious=10, critical=20):
+        self.warning = warning
+        self.suspicious = suspicious
+        self.critical = critical
+
+    def finalize(self, engine):
+        findings = []
+        for state in engine.sources.values():
+            if state.failure_count < self.warning:
+                continue
+            if state.failure_count >= self.critical:
+                risk = "高危"
+            elif state.failure_count >= self.suspicious:
+                risk = "可疑"
+            else:
+                risk = "警告"
+            findings.append(Finding(state.source, state.failure_count, state.time_range(), risk,
+                                    state.usernames, state.target_usernames, self.name))
+        return findings
+
+
+class RateRule(DetectionRule):
+    """同一IP在短时间窗口内的失败登录次数过多"""
+    name = "高频失败"
+
+    def __init__(self, window=timedelta(minutes=1), min_failures=10):
+        self.window = window
+        self.min_failures = min_failures
+
+    def finalize(self, engine):
+        findings = []
+        for state in engine.sources.values():
+            if len(state.failure_times) < self.min_failures:
+                continue
+            times = sorted(state.failure_times)
+            # 滑动窗口求窗口内的最大失败次数
+            best_count = 0
+            best_start = best_end = None
+            for end_index, end_time in enumerate(times):
+                start_index = bisect_left(times, end_time - self.window, 0, end_index + 1)
+                count = end_index - start_index + 1
+                if count > best_count:
+                    best_count = count
+                    best_start, best_end = times[start_index], end_time
+            if best_count >= self.min_failures:
+                findings.append(Finding(state.source, best_count, f"{best_start} 至 {best_end}", "高危",
+                                        state.usernames, state.target_usernames, self.name))
+        return findings
+
+
+class SprayRule(DetectionRule):
+    """密码喷洒：同一IP尝试大量不同用户名，且每个用户名尝试次数很少"""
+    name = "密码喷洒"
+
+    def __init__(self, min_usernames=5, max_attempts_per_user=3):
+        self.min_usernames = min_usernames
+        self.max_attempts_per_user = max_attempts_per_user
+
+    def finalize(self, engine):
+        findings = []
+        for state in engine.sources.values():
+            if len(state.usernames) < self.min_usernames:
+                continue
+            if max(state.usernames.values()) > self.max_attempts_per_user:
+                continue
+            risk = "高危" if len(state.usernames) >= self.min_usernames * 2 else "可疑"
+            findings.append(Finding(state.source, state.failure_count, state.time_range(), risk,
+                                    state.usernames, state.target_usernames, self.name))
+        return findings
+
+
+class SuccessAfterFailuresRule(DetectionRule):
+    """同一IP连续登录失败后登录成功（4625之后出现4624），可能已被破解"""
+    name = "失败后登录成功"
+    event_ids = (4624,)
+
+    def __init__(self, min_failures=3):
+        self.min_failures = min_failures
+        self.findings = {}
+
+    def on_event(self, event, state, engine):
+        if state.pending_failures < self.min_failures:
+            return
+        finding = self.findings.get(state.source)
+        if finding is None or state.pending_failures > finding.count:
+            self.findings[state.source] = Finding(
+                state.source,
+                state.pending_failures,
+                f"{state.pending_first_time} 至 {event['时间']}",
+                "高危",
+                state.usernames,
+                [event['用户名']],
+                self.name
+            )
+
+    def finalize(self, engine):
+        return list(self.findings.values())
+
+
+class NewPrivilegedSourceRule(DetectionRule):
+    """账户的特权登录（4672）来自此前未出现过的来源
+
+    4672 本身不带来源地址，取同一账户最近一次登录成功（4624）的来源
+    """
+    name = "新来源特权登录"
+    event_ids = (4672,)
+
+    def __init__(self):
+        # 用户名 -> 已出现过特权登录的来源
+        self.known_sources = {}
+        self.findings = []
+
+    def on_event(self, event, state, engine):
+        username = event['用户名']
+        lowered = username.lower()
+        if lowered in SERVICE_ACCOUNTS or username.endswith('$') or \
+                lowered.startswith(('dwm-', 'umfd-')):
+            return
+
+        source = engine.last_logon_source.get(username, event['IP地址'])
+        known = self.known_sources.setdefault(username, set())
+        if known and source not in known:
+            self.findings.append(Finding(source, 1, event['时间'], "可疑",
+                                         [username], [username], self.name))
+        known.add(source)
+
+    def finalize(self, engine):
+        return self.findings
+
+
+def default_rules():
+    return [
+        ThresholdRule(),
+        RateRule(),
+        SprayRule(),
+        SuccessAfterFailuresRule(),
+        NewPrivilegedSourceRule()
+    ]
+
+
+class RuleEngine:
+    """在一次遍历中同时运行多条检测规则
+
+    每条事件只更新一次按IP分组的共享状态，再分发给订阅了该事件ID的规则
+    """
+
+    def __init__(self, rules=None):
+        self.rules = rules if rules is not None else default_rules()
+        self.sources = {}
+        # 用户名 -> 最近一次登录成功的来源
+        self.last_logon_source = {}
+
+        self._subscribers = {}
+        for rule in self.rules:
+            for event_id in rule.event_ids:
+                self._subscribers.setdefault(event_id, []).append(rule)
+
+    def get_state(self, source):
+        state = self.sources.get(source)
+        if state is None:
+            state = self.sources[source] = SourceState(source)
+        return state
+
+    def process(self, event):
+        event_id = event['事件ID']
+        if event_id not in (4624, 4625, 4672):
+            return
+
+        state = self.get_state(event['IP地址']) if event_id != 4672 else None
+        if event_id == 4625:
+            state.record_failure(event)
+
+        for rule in self._subscribers.get(event_id, ()):
+            rule.on_event(event, state, self)
+
+        if event_id == 4624:
+            state.record_success(event)
+            self.last_logon_source[event['用户名']] = event['IP地址']
+
+    def run(self, logs):
+        """按时间顺序处理所有日志并返回检测结果（按风险等级排序）"""
+        for event in iter_chronological(logs):
+            self.process(event)
+
+        findings = []
+        for rule in self.rules:
+            findings.extend(rule.finalize(self))
+        findings.sort(key=lambda f: (RISK_ORDER.get(f.risk, 0), f.count), reverse=True)
+        return findings
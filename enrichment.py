@@ -0,0 +1,157 @@
+import ipaddress
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import maxminddb
+except ImportError:
+    maxminddb = None
+
+
+# 表示没有有效来源的占位值
+EMPTY_SOURCES = ['', '-', '未知', 'localhost']
+
+
+class SourceInfo:
+    """来源（IP地址列中的值）的分类和归属信息"""
+    __slots__ = ('value', 'kind', 'scope', 'country', 'city', 'asn', 'org', 'hostname')
+
+    def __init__(self, value, kind, scope, country='', city='', asn=None, org='', hostname=None):
+        self.value = value
+        # IPv4 / IPv6 / 主机名 / 未知
+        self.kind = kind
+        # 公网 / 内网 / 本机 / 链路本地 / 其他
+        self.scope = scope
+        self.country = country
+        self.city = city
+        self.asn = asn
+        self.org = org
+        # 反向DNS结果，None表示尚未查询
+        self.hostname = hostname
+
+    def label(self):
+        """生成在表格中显示的简短说明"""
+        parts = [self.kind if not self.scope else f"{self.kind} {self.scope}"]
+        location = " ".join(part for part in (self.country, self.city) if part)
+        if location:
+            parts.append(location)
+        if self.asn:
+            parts.append(f"AS{self.asn} {self.org}".strip())
+        if self.hostname:
+            parts.append(self.hostname)
+        return " · ".join(parts)
+
+    def to_dict(self):
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+
+def classify_source(value):
+    """判断来源是IPv4、IPv6还是主机名，以及是否为内网地址
+
+    返回 (类型, 范围, 标准化后的IP对象或None)
+    """
+    text = value.strip() if isinstance(value, str) else ""
+    if text.lower() in EMPTY_SOURCES:
+        return "未知", "", None
+
+    try:
+        ip = ipaddress.ip_address(text.split('%')[0])
+    except ValueError:
+        return "主机名", "", None
+
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+
+    if ip.is_loopback or ip.is_unspecified:
+        scope = "本机"
+    elif ip.is_link_local:
+        scope = "链路本地"
+    elif ip.is_private:
+        scope = "内网"
+    elif ip.is_global:
+        scope = "公网"
+    else:
+        scope = "其他"
+    return f"IPv{ip.version}", scope, ip
+
+
+class SourceEnricher:
+    """对来源进行分类，并从本地离线的GeoIP/ASN数据库（.mmdb）中查询归属信息
+
+    每个不同的值只查询一次，结果保存在有上限的LRU缓存中；
+    反向DNS默认关闭，开启后按批并发查询公网地址
+    """
+
+    def __init__(self, database_paths=(), cache_size=100000, reverse_dns=False, dns_workers=16):
+        self.readers = []
+        self.reverse_dns = reverse_dns
+        self.dns_workers = dns_workers
+        self._lookup_cached = lru_cache(maxsize=cache_size)(self._lookup)
+        for path in database_paths:
+            self.open_database(path)
+
+    def open_database(self, path):
+        """打开一个离线数据库文件（GeoLite2-City/Country/ASN 等 .mmdb 格式）"""
+        if maxminddb is None:
+            raise RuntimeError("未安装 maxminddb，无法读取离线GeoIP/ASN数据库")
+        self.readers.append(maxminddb.open_database(path))
+        self._lookup_cached.cache_clear()
+
+    def close(self):
+        for reader in self.readers:
+            reader.close()
+        self.readers = []
+        self._lookup_cached.cache_clear()
+
+    def _lookup(self, value):
+        kind, scope, ip = classify_source(value)
+        info = SourceInfo(value, kind, scope)
+        if ip is None or scope != "公网":
+            return info
+
+        for reader in self.readers:
+            record = reader.get(str(ip))
+            if not record:
+                continue
+            if 'country' in record and not info.country:
+                info.country = self._localized_name(record['country'])
+            if 'city' in record and not info.city:
+                info.city = self._localized_name(record['city'])
+            if 'autonomous_system_number' in record and info.asn is None:
+                info.asn = record['autonomous_system_number']
+                info.org = record.get('autonomous_system_organization', '')
+        return info
+
+    @staticmethod
+    def _localized_name(record):
+        names = record.get('names', {})
+        return names.get('zh-CN') or names.get('en') or record.get('iso_code', '')
+
+    def enrich(self, value):
+        """查询单个来源"""
+        return self._lookup_cached(value)
+
+    def enrich_many(self, values):
+        """批量查询，先去重再查询，返回 {值: SourceInfo}"""
+        results = {value: self._lookup_cached(value) for value in set(values)}
+
+        if self.reverse_dns:
+            pending = [info for info in results.values()
+                       if info.scope == "公网" and info.hostname is None]
+            if pending:
+                with ThreadPoolExecutor(max_workers=self.dns_workers) as executor:
+                    for info, hostname in zip(pending, executor.map(self._reverse_lookup, pending)):
+                        # SourceInfo 对象保存在缓存中，反向解析结果也随之缓存
+                        info.hostname = hostname
+        return results
+
+    @staticmethod
+    def _reverse_lookup(info):
+        try:
+            return socket.gethostbyaddr(info.value)[0]
+        except (OSError, UnicodeError):
+            return ''
+
+    def cache_info(self):
+        return self._lookup_cached.cache_info()
@@ -0,0 +1,162 @@
+from enrichment import classify_source
+
+
+# 关注的事件ID和描述
+SECURITY_EVENTS = {
+    4624: "登录成功",
+    4625: "登录失败",
+    4648: "明文登录",
+    4672: "特权登录"
+}
+
+
+class StringPool:
+    """字符串驻留池，相同内容的字符串只保留一个对象"""
+    __slots__ = ('_values',)
+
+    def __init__(self):
+        self._values = {}
+
+    def intern(self, value):
+        if not isinstance(value, str):
+            return value
+        return self._values.setdefault(value, value)
+
+    def get(self, value):
+        """返回池中与 value 相同的字符串对象，不存在时返回None"""
+        return self._values.get(value)
+
+    def clear(self):
+        self._values.clear()
+
+    def __len__(self):
+        return len(self._values)
+
+
+class LoginEvent:
+    """紧凑的登录事件记录
+
+    使用 __slots__ 存储字段，同时兼容原来按中文字段名取值的写法，
+    例如 event['IP地址']、event.get('详情', '')
+    """
+    __slots__ = ('time', 'event_id', 'event_type', 'ip_address',
+                 'username', 'login_result', 'details')
+
+    # 中文字段名到属性名的映射
+    FIELD_NAMES = {
+        '时间': 'time',
+        '事件ID': 'event_id',
+        '事件类型': 'event_type',
+        'IP地址': 'ip_address',
+        '用户名': 'username',
+        '登录结果': 'login_result',
+        '详情': 'details'
+    }
+
+    def __init__(self, time, event_id, event_type, ip_address, username, login_result, details):
+        self.time = time
+        self.event_id = event_id
+        self.event_type = event_type
+        self.ip_address = ip_address
+        self.username = username
+        self.login_result = login_result
+        self.details = details
+
+    def __getitem__(self, key):
+        return getattr(self, self.FIELD_NAMES[key])
+
+    def get(self, key, default=None):
+        attr = self.FIELD_NAMES.get(key)
+        if attr is None:
+            return default
+        return getattr(self, attr)
+
+    def keys(self):
+        return self.FIELD_NAMES.keys()
+
+    def to_dict(self):
+        """转换为以中文字段名为键的字典"""
+        return {key: getattr(self, attr) for key, attr in self.FIELD_NAMES.items()}
+
+    def __repr__(self):
+        return f"LoginEvent({self.to_dict()!r})"
+
+
+class LoginEventFactory:
+    """创建 LoginEvent，并把IP、用户名、主机名和各类标签驻留到共享的字符串池中"""
+
+    def __init__(self):
+        self.ip_pool = StringPool()
+        self.username_pool = StringPool()
+        self.hostname_pool = StringPool()
+        self.label_pool = StringPool()
+
+    def intern_source(self, value):
+        """IP地址列里可能是IP也可能是工作站名/域名，按 classify_source 的判断分别放入不同的池
+
+        已在池中的值直接返回，每个不同的值只判断一次
+        """
+        if not isinstance(value, str):
+            return value
+        pooled = self.ip_pool.get(value)
+        if pooled is None:
+            pooled = self.hostname_pool.get(value)
+        if pooled is not None:
+            return pooled
+        if classify_source(value)[0] in ("IPv4", "IPv6"):
+            return self.ip_pool.intern(value)
+        return self.hostname_pool.intern(value)
+
+    def create(self, time, event_id, event_type, ip_address, username, login_result, details):
+        return LoginEvent(
+            time,
+            event_id,
+            self.label_pool.intern(event_type),
+            self.intern_source(ip_address),
+            self.username_pool.intern(username),
+            self.label_pool.intern(login_result),
+            self.label_pool.intern(details)
+        )
+
+    def pool_sizes(self):
+        """返回各字符串池中不同值的数量"""
+        return {
+            'IP地址': len(self.ip_pool),
+            '用户名': len(self.username_pool),
+            '主机名': len(self.hostname_pool),
+            '标签': len(self.label_pool)
+        }
+
+    def clear(self):
+        self.ip_pool.clear()
+        self.username_pool.clear()
+        self.hostname_pool.clear()
+        self.label_pool.clear()
+
+
+def event_matcher(event_id="", ip_address="", username=""):
+    """生成筛选函数：事件ID精确匹配，IP地址和用户名不区分大小写的包含匹配
+
+    事件ID不是数字时抛出 ValueError
+    """
+    event_id = int(event_id) if event_id else None
+    ip_address = ip_address.lower()
+    username = username.lower()
+
+    def match(log):
+        if event_id is not None and log['事件ID'] != event_id:
+            return False
+        if ip_address and ip_address not in log['IP地址'].lower():
+            return False
+        if username and username not in log['用户名'].lower():
+            return False
+        return True
+    return match
+
+
+def filter_events(events, event_id="", ip_address="", username=""):
+    """按事件ID、IP地址和用户名筛选日志，事件ID不是数字时抛出 ValueError"""
+    if not (event_id or ip_address or username):
+        return events
+    match = event_matcher(event_id, ip_address, username)
+    return [log for log in events if match(log)]
@@ -0,0 +1,203 @@
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+
+from Evtx.Evtx import Evtx, Record
+
+from event_store import SECURITY_EVENTS
+
+
+# 记录在数据块内只是大致按时间排序，判断整块是否落在时间范围外时留出的容差
+CHUNK_TIME_SLACK = timedelta(minutes=5)
+
+
+def parse_time_bound(text):
+    """解析时间范围参数，返回UTC时间（不带时区），空字符串返回None
+
+    支持绝对时间（如 2024-01-01 08:00:00，按本地时间解释）
+    以及相对时间（如 30m、48h、7d，表示距现在多久之前）
+    """
+    text = text.strip() if text else ""
+    if not text:
+        return None
+
+    relative = re.match(r'^(\d+)\s*([mhd])$', text, re.IGNORECASE)
+    if relative:
+        amount = int(relative.group(1))
+        unit = relative.group(2).lower()
+        delta = {'m': timedelta(minutes=amount),
+                 'h': timedelta(hours=amount),
+                 'd': timedelta(days=amount)}[unit]
+        return datetime.now(timezone.utc).replace(tzinfo=None) - delta
+
+    try:
+        value = datetime.fromisoformat(text.replace('/', '-'))
+    except ValueError:
+        raise ValueError(f"无法识别的时间格式: {text}")
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def probe_chunk_time_range(chunk):
+    """读取数据块首尾两条记录头部的时间戳，不解析记录内容
+
+    返回 (最早时间, 最晚时间)，无法读取或时间戳为0（解析为 datetime.min）时返回None
+    """
+    try:
+        first = chunk.first_record().timestamp()
+        last = Record(chunk._buf, chunk.offset() + chunk.last_record_offset(), chunk).timestamp()
+    except Exception:
+        return None
+    if first == datetime.min or last == datetime.min:
+        return None
+    return min(first, last), max(first, last)
+
+
+def _with_slack(value, delta):
+    """时间加减容差，超出datetime范围时取边界值"""
+    try:
+        return value + delta
+    except OverflowError:
+        return datetime.min if delta < timedelta(0) else datetime.max
+
+
+def iter_evtx_records_in_range(log, since=None, until=None, stats=None):
+    """按时间范围遍历EVTX记录，整块落在范围之外的数据块直接跳过
+
+    只有跨越时间边界的数据块才会逐条比较记录时间，
+    stats 字典（可选）中会累计 'chunks'、'skipped_chunks'、'boundary_chunks'
+    """
+    if stats is None:
+        stats = {}
+    for key in ('chunks', 'skipped_chunks', 'boundary_chunks'):
+        stats.setdefault(key, 0)
+
+    for chunk in log.chunks():
+        stats['chunks'] += 1
+
+        if since is None and until is None:
+            yield from chunk.records()
+            continue
+
+        time_range = probe_chunk_time_range(chunk)
+        if time_range is not None:
+            first_time = _with_slack(time_range[0], -CHUNK_TIME_SLACK)
+            last_time = _with_slack(time_range[1], CHUNK_TIME_SLACK)
+            if since is not None and last_time < since:
+                stats['skipped_chunks'] += 1
+                continue
+            if until is not None and first_time > until:
+                stats['skipped_chunks'] += 1
+                continue
+            if (since is None or first_time >= since) and \
+                    (until is None or last_time <= until):
+                # 整块都在时间范围内
+                yield from chunk.records()
+                continue
+
+        # 边界数据块：逐条比较记录头部的时间戳
+        stats['boundary_chunks'] += 1
+        for record in chunk.records():
+            try:
+                record_time = record.timestamp()
+            except Exception:
+                yield record
+                continue
+            if since is not None and record_time < since:
+                continue
+            if until is not None and record_time > until:
+                continue
+            yield record
+
+
+def parse_evtx_record(record, factory, security_events=SECURITY_EVENTS):
+    """解析单条EVTX记录，不是关注的事件时返回None"""
+    # 解析XML内容
+    xml_content = record.xml()
+    event = ET.fromstring(xml_content)
+
+    # 获取System节点
+    system = event.find('.//{http://schemas.microsoft.com/win/2004/08/events/event}System')
+    if system is None:
+        return None
+
+    # 获取事件ID
+    event_id_elem = system.find('.//{http://schemas.microsoft.com/win/2004/08/events/event}EventID')
+    if event_id_elem is None:
+        return None
+
+    event_id = int(event_id_elem.text)
+
+    # 只处理我们关注的事件ID
+    if event_id not in security_events:
+        return None
+
+    # 获取时间
+    time_created = system.find('.//{http://schemas.microsoft.com/win/2004/08/events/event}TimeCreated')
+    event_time = time_created.get('SystemTime') if time_created is not None else ''
+
+    # 获取EventData节点
+    event_data = event.find('.//{http://schemas.microsoft.com/win/2004/08/events/event}EventData')
+    if event_data is None:
+        return None
+
+    # 解析事件数据
+    data = {}
+    for data_item in event_data.findall('.//{http://schemas.microsoft.com/win/2004/08/events/event}Data'):
+        name = data_item.get('Name')
+        if name:
+            data[name] = data_item.text if data_item.text else ''
+
+    # 根据事件ID提取相关信息
+    if event_id == 4624:  # 登录成功
+        ip_address = data.get('IpAddress', data.get('WorkstationName', '未知'))
+        username = data.get('TargetUserName', '未知')
+        logon_type = data.get('LogonType', '未知')
+        details = f"登录类型: {logon_type}, 进程: {data.get('ProcessName', '未知')}"
+        login_result = '成功'
+
+    elif event_id == 4625:  # 登录失败
+        ip_address = data.get('IpAddress', data.get('WorkstationName', '未知'))
+        username = data.get('TargetUserName', '未知')
+        sub_status = data.get('SubStatus', '未知')
+        details = f"失败原因: {sub_status}, 登录类型: {data.get('LogonType', '未知')}"
+        login_result = '失败'
+
+    elif event_id == 4648:  # 使用明文凭据尝试登录
+        ip_address = data.get('TargetServerName', '未知')
+        username = data.get('TargetUserName', '未知')
+        details = f"进程: {data.get('ProcessName', '未知')}"
+        login_result = '明文尝试'
+
+    elif event_id == 4672:  # 特权登录
+        ip_address = data.get('WorkstationName', '未知')
+        username = data.get('SubjectUserName', '未知')
+        details = f"特权: {data.get('PrivilegeList', '未知')}"
+        login_result = '特权登录'
+
+    # 返回日志条目
+    return factory.create(
+        event_time,
+        event_id,
+        security_events[event_id],
+        ip_address,
+        username,
+        login_result,
+        details
+    )
+
+
+def load_evtx_events(file_path, factory, since=None, until=None, stats=None):
+    """读取EVTX文件中关注的登录事件，返回 LoginEvent 列表，跳过无法解析的记录"""
+    events = []
+    with Evtx(file_path) as log:
+        for record in iter_evtx_records_in_range(log, since, until, stats):
+            try:
+                log_entry = parse_evtx_record(record, factory)
+                if log_entry is not None:
+                    events.append(log_entry)
+            except Exception as e:
+                print(f"跳过无效记录: {e}")
+                continue
+    return events
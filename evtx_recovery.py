@@ -0,0 +1,295 @@
+import mmap
+import struct
+import zlib
+
+from Evtx.Evtx import ChunkHeader, Record
+
+
+CHUNK_SIZE = 0x10000
+CHUNK_HEADER_SIZE = 0x200
+FILE_HEADER_SIZE = 0x1000
+
+FILE_MAGIC = b"ElfFile\x00"
+CHUNK_MAGIC = b"ElfChnk\x00"
+RECORD_MAGIC = b"\x2a\x2a\x00\x00"
+# 记录头部：magic(4) + size(4) + record_num(8) + timestamp(8)，末尾还有重复的size(4)
+MIN_RECORD_SIZE = 0x1C
+# 数据块头部中的字符串表（64个链表头）和模板表（32个链表头）
+STRING_TABLE = (0x80, 64)
+TEMPLATE_TABLE = (0x180, 32)
+
+# 数据块状态
+STATUS_OK = "ok"
+STATUS_HEADER_CHECKSUM = "header_checksum"
+STATUS_DATA_CHECKSUM = "data_checksum"
+STATUS_NO_MAGIC = "no_magic"
+STATUS_TRUNCATED = "truncated"
+
+STATUS_LABELS = {
+    STATUS_OK: "正常",
+    STATUS_HEADER_CHECKSUM: "头部校验失败",
+    STATUS_DATA_CHECKSUM: "数据校验失败",
+    STATUS_NO_MAGIC: "未分配空间",
+    STATUS_TRUNCATED: "末尾不完整",
+}
+
+
+class ChunkStatus:
+    """一个64KB数据块的校验结果和恢复统计"""
+    __slots__ = ('index', 'offset', 'status', 'in_header', 'first_record', 'last_record',
+                 'next_record_offset', 'parsed', 'carved', 'unreadable', 'candidates')
+
+    def __init__(self, index, offset, status, in_header):
+        self.index = index
+        self.offset = offset
+        self.status = status
+        # 是否在文件头声明的数据块数量之内
+        self.in_header = in_header
+        self.first_record = None
+        self.last_record = None
+        self.next_record_offset = None
+        # 正常解析、签名扫描恢复、识别到但无法解析的记录数
+        self.parsed = 0
+        self.carved = 0
+        self.unreadable = 0
+        # 签名扫描找到的候选记录偏移（绝对偏移）
+        self.candidates = []
+
+
+class EvtxRecoveryScanner:
+    """EVTX完整性扫描和记录恢复
+
+    第一遍校验文件头和每个数据块的CRC32，同时在损坏的数据块、未分配空间、
+    正常数据块的空闲区域以及文件末尾不完整的部分中按记录签名扫描候选记录；
+    之后由 records() 依次产出可以解析的记录，并统计恢复和跳过的情况。
+    必须在 with 语句中使用
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.file_header_ok = False
+        self.header_chunk_count = 0
+        self.chunks = []
+        # 文件末尾不足一个数据块的字节数（文件被截断或从磁盘中提取时常见）
+        self.truncated_bytes = 0
+        self.duplicates = 0
+        # 不在导入时间范围内而被跳过的记录数
+        self.out_of_range = 0
+        self.failures = []
+        self._file = None
+        self._buf = None
+
+    def __enter__(self):
+        self._file = open(self.file_path, "rb")
+        self._buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self._buf.close()
+        self._file.close()
+        self._buf = None
+
+    def _crc32(self, start, end):
+        with memoryview(self._buf) as view, view[start:end] as part:
+            return zlib.crc32(part) & 0xFFFFFFFF
+
+    def _check_file_header(self):
+        buf = self._buf
+        if len(buf) < FILE_HEADER_SIZE or buf[0:8] != FILE_MAGIC:
+            return False
+        stored_checksum = struct.unpack_from("<I", buf, 0x7C)[0]
+        self.header_chunk_count = struct.unpack_from("<H", buf, 0x2A)[0]
+        return self._crc32(0, 0x78) == stored_checksum
+
+    def _check_chunk(self, index):
+        offset = FILE_HEADER_SIZE + index * CHUNK_SIZE
+        buf = self._buf
+        status = ChunkStatus(index, offset, STATUS_OK, index < self.header_chunk_count)
+
+        if buf[offset:offset + 8] != CHUNK_MAGIC:
+            status.status = STATUS_NO_MAGIC
+            status.candidates = self._find_candidates(offset + CHUNK_HEADER_SIZE, offset + CHUNK_SIZE)
+            return status
+
+        (status.first_record, status.last_record) = struct.unpack_from("<QQ", buf, offset + 0x18)
+        next_record_offset = struct.unpack_from("<I", buf, offset + 0x30)[0]
+        data_checksum = struct.unpack_from("<I", buf, offset + 0x34)[0]
+        header_checksum = struct.unpack_from("<I", buf, offset + 0x7C)[0]
+
+        header_crc = zlib.crc32(buf[offset + 0x80:offset + CHUNK_HEADER_SIZE],
+                                zlib.crc32(buf[offset:offset + 0x78])) & 0xFFFFFFFF
+        if header_crc != header_checksum or \
+                not CHUNK_HEADER_SIZE <= next_record_offset <= CHUNK_SIZE:
+            status.status = STATUS_HEADER_CHECKSUM
+            status.candidates = self._find_candidates(offset + CHUNK_HEADER_SIZE, offset + CHUNK_SIZE)
+            return status
+
+        status.next_record_offset = next_record_offset
+        if self._crc32(offset + CHUNK_HEADER_SIZE, offset + next_record_offset) != data_checksum:
+            status.status = STATUS_DATA_CHECKSUM
+            status.candidates = self._find_candidates(offset + CHUNK_HEADER_SIZE, offset + CHUNK_SIZE)
+            return status
+
+        # 正常数据块只扫描已用区域之后的空闲空间，那里可能残留旧记录
+        status.candidates = self._find_candidates(offset + next_record_offset, offset + CHUNK_SIZE)
+        return status
+
+    def _find_candidates(self, start, end):
+        """按签名在指定范围内查找大小字段前后一致的候选记录"""
+        buf = self._buf
+        candidates = []
+        position = buf.find(RECORD_MAGIC, start, end)
+        while position != -1:
+            size = struct.unpack_from("<I", buf, position + 4)[0] if position + 8 <= end else 0
+            if MIN_RECORD_SIZE <= size <= end - position and \
+                    struct.unpack_from("<I", buf, position + size - 4)[0] == size:
+                candidates.append(position)
+                position = buf.find(RECORD_MAGIC, position + size, end)
+            else:
+                position = buf.find(RECORD_MAGIC, position + 1, end)
+        return candidates
+
+    def _tables_valid(self, offset):
+        """检查数据块头部的字符串表和模板表
+
+        python-evtx 沿 next_offset 加载这两个表时不做边界和循环检查，
+        头部损坏的数据块中链表可能指向数据块之外或首尾相连，渲染记录时会死循环
+        """
+        buf = self._buf
+        limit = min(CHUNK_SIZE, len(buf) - offset)
+        if limit < CHUNK_HEADER_SIZE:
+            return False
+
+        for (table, count), is_template in ((STRING_TABLE, False), (TEMPLATE_TABLE, True)):
+            visited = set()
+            for node in struct.unpack_from(f"<{count}I", buf, offset + table):
+                while node > 0:
+                    if node in visited or not CHUNK_HEADER_SIZE <= node <= limit - 4:
+                        return False
+                    # 与 python-evtx 一致：模板前的标记不符时停止加载这条链
+                    if is_template and \
+                            (buf[offset + node - 10] != 0x0C or
+                             struct.unpack_from("<I", buf, offset + node - 4)[0] != node):
+                        break
+                    visited.add(node)
+                    node = struct.unpack_from("<I", buf, offset + node)[0]
+        return True
+
+    def scan(self):
+        """校验所有数据块（包括文件头未声明的部分），返回 ChunkStatus 列表
+
+        文件末尾不足一个数据块的部分按未分配空间扫描，字节数记入 truncated_bytes
+        """
+        self.file_header_ok = self._check_file_header()
+        slot_count = max((len(self._buf) - FILE_HEADER_SIZE) // CHUNK_SIZE, 0)
+        self.chunks = [self._check_chunk(index) for index in range(slot_count)]
+
+        tail = FILE_HEADER_SIZE + slot_count * CHUNK_SIZE
+        if tail < len(self._buf):
+            self.truncated_bytes = len(self._buf) - tail
+            status = ChunkStatus(slot_count, tail, STATUS_TRUNCATED, slot_count < self.header_chunk_count)
+            status.candidates = self._find_candidates(tail, len(self._buf))
+            self.chunks.append(status)
+        return self.chunks
+
+    @staticmethod
+    def _in_range(record, since, until):
+        if since is None and until is None:
+            return True
+        try:
+            record_time = record.timestamp()
+        except Exception:
+            return True
+        return (since is None or record_time >= since) and (until is None or record_time <= until)
+
+    def records(self, since=None, until=None):
+        """产出所有可解析的记录
+
+        正常数据块按顺序解析；损坏的数据块、未分配空间和空闲区域中的候选记录
+        按记录号去重后产出（已正常解析过的记录号不会重复产出）。
+        异常数据块的字符串表或模板表已损坏时，其中的记录无法安全渲染，计为无法解析。
+        指定 since/until（UTC）时，范围外的记录不产出，单独计入 out_of_range
+        """
+        if not self.chunks:
+            self.scan()
+
+        seen = set()
+        for status in self.chunks:
+            if status.status != STATUS_OK:
+                continue
+            chunk = ChunkHeader(self._buf, status.offset)
+            for record in chunk.records():
+                seen.add(record.record_num())
+                if not self._in_range(record, since, until):
+                    self.out_of_range += 1
+                    continue
+                status.parsed += 1
+                yield record
+
+        for status in self.chunks:
+            # 模板和字符串表按数据块内偏移引用，仍按所在的64KB边界构造数据块
+            chunk = ChunkHeader(self._buf, status.offset)
+            tables_valid = None
+            for position in status.candidates:
+                try:
+                    record = Record(self._buf, position, chunk)
+                    record_num = record.record_num()
+                except Exception:
+                    status.unreadable += 1
+                    continue
+                if record_num in seen:
+                    self.duplicates += 1
+                    continue
+                # 表已损坏的记录不占用记录号，其他位置的副本仍可恢复
+                if status.status != STATUS_OK:
+                    if tables_valid is None:
+                        tables_valid = self._tables_valid(status.offset)
+                    if not tables_valid:
+                        status.unreadable += 1
+                        continue
+                seen.add(record_num)
+                if not self._in_range(record, since, until):
+                    self.out_of_range += 1
+                    continue
+                status.carved += 1
+                yield record
+
+    def record_failed(self, record, error):
+        """由调用方在记录无法解析时调用，计入报告"""
+        for status in self.chunks:
+            if status.offset <= record.offset() < status.offset + CHUNK_SIZE:
+                if record.offset() in status.candidates:
+                    status.carved -= 1
+                else:
+                    status.parsed -= 1
+                status.unreadable += 1
+                break
+        self.failures.append((record.offset(), str(error)))
+
+    def summary(self, max_details=20):
+        """生成恢复报告文本，最多逐个列出 max_details 个异常数据块"""
+        counts = {}
+        for status in self.chunks:
+            counts[status.status] = counts.get(status.status, 0) + 1
+
+        lines = [
+            f"文件头: {'正常' if self.file_header_ok else '损坏'}"
+            f"（声明 {self.header_chunk_count} 个数据块，实际扫描 {len(self.chunks)} 个"
+            + (f"，末尾 {self.truncated_bytes} 字节不足一个数据块" if self.truncated_bytes else "") + "）",
+            "数据块: " + "，".join(f"{STATUS_LABELS[key]} {counts[key]} 个"
+                                   for key in STATUS_LABELS if key in counts),
+            f"正常解析记录: {sum(status.parsed for status in self.chunks)} 条",
+            f"签名扫描恢复记录: {sum(status.carved for status in self.chunks)} 条",
+            f"无法解析记录: {sum(status.unreadable for status in self.chunks)} 条",
+            f"重复记录: {self.duplicates} 条",
+            f"时间范围外记录: {self.out_of_range} 条",
+        ]
+
+        damaged = [status for status in self.chunks
+                   if status.status != STATUS_OK and (status.in_header or status.candidates)]
+        for status in damaged[:max_details]:
+            lines.append(f"  数据块 #{status.index}（偏移 {status.offset:#x}）{STATUS_LABELS[status.status]}："
+                         f"恢复 {status.carved} 条，无法解析 {status.unreadable} 条")
+        if len(damaged) > max_details:
+            lines.append(f"  ……其余 {len(damaged) - max_details} 个异常数据块未列出")
+        return "\n".join(lines)
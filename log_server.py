@@ -0,0 +1,426 @@
+"""本地HTTP/JSON查询服务
+
+证据文件只加载一次，多个分析人员可以同时查询筛选结果、分页浏览、
+获取爆破检测结果和导出CSV；Tk界面可以通过 LogServerClient 作为瘦客户端使用。
+
+用法: python log_server.py evidence.evtx [--host 127.0.0.1] [--port 8765] [--since 48h]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import time
+from array import array
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, urlencode
+from urllib.request import urlopen
+
+from event_store import LoginEventFactory, event_matcher
+from evtx_reader import load_evtx_events, parse_time_bound
+from detection_rules import RuleEngine
+from enrichment import SourceEnricher
+
+
+DEFAULT_PORT = 8765
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 5000
+# 导出时每批写出的行数
+EXPORT_BATCH_SIZE = 1000
+
+# 与界面导出的CSV字段保持一致
+EXPORT_FIELDS = ['时间', '事件ID', '事件类型', 'IP地址', '用户名', '登录结果', '详细信息']
+BRUTE_FORCE_FIELDS = ["IP地址", "来源信息", "失败次数", "时间范围", "风险等级", "尝试的用户名", "目标用户名", "检测规则"]
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                500: "Internal Server Error"}
+
+
+class ResultCache:
+    """按总行数限制大小的LRU结果缓存，所有客户端共享
+
+    每个条目按其行数计入总量，超出 max_rows 时淘汰最久未使用的条目；
+    单个条目超过 max_rows 时不缓存
+    """
+
+    def __init__(self, max_rows):
+        self.max_rows = max_rows
+        self.total_rows = 0
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        rows = len(value)
+        if rows > self.max_rows:
+            return
+        if key in self._entries:
+            self.total_rows -= len(self._entries.pop(key))
+        self._entries[key] = value
+        self.total_rows += rows
+        while self.total_rows > self.max_rows:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_rows -= len(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self.total_rows = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RequestMetrics:
+    """按路径统计请求次数、耗时和错误数"""
+
+    def __init__(self):
+        self.routes = {}
+
+    def record(self, route, seconds, status):
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        elapsed_ms = seconds * 1000
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        if status >= 400:
+            stats['errors'] += 1
+
+    def snapshot(self):
+        return {
+            route: {
+                'count': stats['count'],
+                'errors': stats['errors'],
+                'avg_ms': round(stats['total_ms'] / stats['count'], 3),
+                'max_ms': round(stats['max_ms'], 3)
+            }
+            for route, stats in self.routes.items()
+        }
+
+
+def filter_event_indices(events, event_id="", ip_address="", username=""):
+    """与 filter_events 的筛选语义相同，但返回匹配事件的下标数组，便于缓存"""
+    match = event_matcher(event_id, ip_address, username)
+    return array('I', (index for index, log in enumerate(events) if match(log)))
+
+
+class EventStoreService:
+    """加载一次的事件存储，以及在其上的筛选、爆破检测和结果缓存
+
+    筛选结果以事件下标数组的形式缓存，缓存的总行数默认不超过事件总数的两倍
+    """
+
+    def __init__(self, events, sources=(), enricher=None, cache_rows=None):
+        self.events = events
+        self.sources = list(sources)
+        self.enricher = enricher or SourceEnricher()
+        self.cache = ResultCache(cache_rows if cache_rows is not None else max(len(events), 1) * 2)
+        # 正在计算中的查询，相同的并发请求只计算一次
+        self._pending = {}
+
+    @classmethod
+    def from_evtx(cls, file_paths, since=None, until=None, enricher=None):
+        factory = LoginEventFactory()
+        events = []
+        for file_path in file_paths:
+            events.extend(load_evtx_events(file_path, factory, since, until))
+        return cls(events, file_paths, enricher)
+
+    async def get_or_compute(self, key, func, *args):
+        """先查缓存，未命中时在线程池中计算，并合并相同的并发请求"""
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await pending
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, func, *args)
+        self._pending[key] = future
+        try:
+            result = await future
+        finally:
+            del self._pending[key]
+        self.cache.put(key, result)
+        return result
+
+    async def query(self, event_id="", ip_address="", username=""):
+        """返回匹配事件的下标数组
+
+        筛选语义与界面的“应用筛选”相同，事件ID不是数字时抛出 ValueError
+        """
+        if event_id:
+            int(event_id)
+        key = ('events', event_id, ip_address.lower(), username.lower())
+        return await self.get_or_compute(key, filter_event_indices, self.events, event_id, ip_address, username)
+
+    async def brute_force(self):
+        return await self.get_or_compute(('brute_force',), self._detect_brute_force)
+
+    def _detect_brute_force(self):
+        findings = RuleEngine().run(self.events)
+        sources = self.enricher.enrich_many(finding.source for finding in findings)
+        rows = []
+        for finding in findings:
+            values = finding.values()
+            row = (values[0], sources[finding.source].label()) + values[1:]
+            rows.append(dict(zip(BRUTE_FORCE_FIELDS, row)))
+        return rows
+
+    def status(self):
+        return {
+            'sources': self.sources,
+            'events': len(self.events),
+            'cache_entries': len(self.cache),
+            'cache_hits': self.cache.hits,
+            'cache_misses': self.cache.misses
+        }
+
+
+def event_to_dict(log):
+    return {key: log.get(key) for key in ('时间', '事件ID', '事件类型', 'IP地址', '用户名', '登录结果', '详情')}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class StreamAborted(Exception):
+    """响应头和部分内容已经发出后出错，只能直接断开连接"""
+
+
+class LogServer:
+    """基于 asyncio 的简单HTTP/JSON服务（只支持GET，每个连接处理一个请求）"""
+
+    def __init__(self, service, host="127.0.0.1", port=DEFAULT_PORT):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.metrics = RequestMetrics()
+        self.routes = {
+            '/status': self.handle_status,
+            '/events': self.handle_events,
+            '/brute-force': self.handle_brute_force,
+            '/export': self.handle_export,
+            '/metrics': self.handle_metrics,
+        }
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        # 端口为0时使用系统分配的端口
+        self.port = server.sockets[0].getsockname()[1]
+        print(f"日志查询服务已启动: http://{self.host}:{self.port}（共 {len(self.service.events)} 条日志）")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        started = time.perf_counter()
+        route = "?"
+        status = 500
+        try:
+            request_line = (await reader.readline()).decode('latin-1').strip()
+            if not request_line:
+                # 没有发送任何请求的连接不计入统计
+                status = None
+                return
+            # 读取并忽略请求头
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+
+            try:
+                parts = request_line.split()
+                if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+                    raise HttpError(400, "无效的请求")
+                method, target = parts[:2]
+                url = urlsplit(target)
+                route = url.path.rstrip('/') or '/'
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+                if method != 'GET':
+                    raise HttpError(405, "只支持GET请求")
+                handler = self.routes.get(route)
+                if handler is None:
+                    raise HttpError(404, f"未知的路径: {route}")
+                status = await handler(params, writer)
+            except StreamAborted:
+                status = 500
+            except HttpError as e:
+                status = e.status
+                await self.send_json(writer, {'error': str(e)}, e.status)
+            except Exception as e:
+                status = 500
+                await self.send_json(writer, {'error': str(e)}, 500)
+        except ConnectionError:
+            status = 400
+        finally:
+            if status is not None:
+                self.metrics.record(route, time.perf_counter() - started, status)
+            writer.close()
+
+    async def send_json(self, writer, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        writer.write(self._headers(status, 'application/json; charset=utf-8',
+                                   [f"Content-Length: {len(body)}"]))
+        writer.write(body)
+        await writer.drain()
+        return status
+
+    @staticmethod
+    def _headers(status, content_type, extra=()):
+        lines = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+                 f"Content-Type: {content_type}",
+                 "Connection: close"]
+        lines.extend(extra)
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+    async def _filtered(self, params):
+        try:
+            return await self.service.query(params.get('event_id', '').strip(),
+                                            params.get('ip', '').strip(),
+                                            params.get('username', '').strip())
+        except ValueError:
+            raise HttpError(400, "事件ID必须是数字")
+
+    @staticmethod
+    def _int_param(params, name, default):
+        try:
+            return int(params.get(name, default))
+        except ValueError:
+            raise HttpError(400, f"参数 {name} 必须是数字")
+
+    async def handle_status(self, params, writer):
+        return await self.send_json(writer, self.service.status())
+
+    async def handle_metrics(self, params, writer):
+        return await self.send_json(writer, {'requests': self.metrics.snapshot(),
+                                             'cache': self.service.status()})
+
+    async def handle_events(self, params, writer):
+        """分页返回筛选结果: /events?event_id=&ip=&username=&offset=0&limit=100"""
+        offset = max(self._int_param(params, 'offset', 0), 0)
+        limit = min(max(self._int_param(params, 'limit', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+        indices = await self._filtered(params)
+        events = self.service.events
+        return await self.send_json(writer, {
+            'total': len(indices),
+            'offset': offset,
+            'limit': limit,
+            'events': [event_to_dict(events[index]) for index in indices[offset:offset + limit]]
+        })
+
+    async def handle_brute_force(self, params, writer):
+        return await self.send_json(writer, {'results': await self.service.brute_force()})
+
+    async def handle_export(self, params, writer):
+        """以分块传输的方式流式导出CSV，参数同 /events"""
+        indices = await self._filtered(params)
+        events = self.service.events
+        writer.write(self._headers(200, 'text/csv; charset=utf-8', [
+            "Transfer-Encoding: chunked",
+            "Content-Disposition: attachment; filename=\"logs.csv\""
+        ]))
+
+        # 响应头已发出，出错时不能再写JSON错误，只能断开连接
+        try:
+            buffer = io.StringIO()
+            csv_writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+            csv_writer.writeheader()
+            for start in range(0, len(indices), EXPORT_BATCH_SIZE):
+                for index in indices[start:start + EXPORT_BATCH_SIZE]:
+                    log = events[index]
+                    csv_writer.writerow({
+                        '时间': log.get('时间', ''),
+                        '事件ID': log.get('事件ID', ''),
+                        '事件类型': log.get('事件类型', ''),
+                        'IP地址': log.get('IP地址', ''),
+                        '用户名': log.get('用户名', ''),
+                        '登录结果': log.get('登录结果', ''),
+                        '详细信息': log.get('详情', '')
+                    })
+                await self._write_chunk(writer, buffer)
+            await self._write_chunk(writer, buffer)
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        except Exception as e:
+            print(f"导出中断: {e}")
+            writer.transport.abort()
+            raise StreamAborted() from e
+        return 200
+
+    @staticmethod
+    async def _write_chunk(writer, buffer):
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        if data:
+            writer.write(f"{len(data):X}\r\n".encode('latin-1') + data + b"\r\n")
+            await writer.drain()
+
+
+class LogServerClient:
+    """Tk界面使用的瘦客户端"""
+
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def _url(self, path, params=None):
+        query = urlencode({key: value for key, value in (params or {}).items() if value != ''})
+        return f"{self.base_url}{path}" + (f"?{query}" if query else "")
+
+    def _get_json(self, path, params=None):
+        with urlopen(self._url(path, params), timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+    def status(self):
+        return self._get_json('/status')
+
+    def events_page(self, event_id="", ip_address="", username="", offset=0, limit=DEFAULT_PAGE_SIZE):
+        """获取一页筛选结果，返回包含 total、offset、limit、events 的字典"""
+        return self._get_json('/events', {'event_id': event_id, 'ip': ip_address, 'username': username,
+                                          'offset': offset, 'limit': limit})
+
+    def brute_force(self):
+        """返回爆破检测结果，每行与爆破检测结果表格的列顺序一致"""
+        return [tuple(row[field] for field in BRUTE_FORCE_FIELDS)
+                for row in self._get_json('/brute-force')['results']]
+
+    def export(self, file_path, event_id="", ip_address="", username=""):
+        params = {'event_id': event_id, 'ip': ip_address, 'username': username}
+        with urlopen(self._url('/export', params), timeout=self.timeout) as response, \
+                open(file_path, 'wb') as f:
+            while True:
+                data = response.read(64 * 1024)
+                if not data:
+                    break
+                f.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Windows日志分析查询服务")
+    parser.add_argument("files", nargs="+", help="要加载的EVTX文件")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址（默认只监听本机）")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--since", default="", help="导入起始时间，如 \"2024-01-01 08:00:00\" 或 48h")
+    parser.add_argument("--until", default="", help="导入结束时间，格式同 --since")
+    parser.add_argument("--geoip-db", action="append", default=[], help="离线GeoIP/ASN数据库（.mmdb），可指定多次")
+    args = parser.parse_args()
+
+    service = EventStoreService.from_evtx(args.files,
+                                          parse_time_bound(args.since),
+                                          parse_time_bound(args.until),
+                                          SourceEnricher(args.geoip_db))
+    asyncio.run(LogServer(service, args.host, args.port).serve_forever())
@@ -0,0 +1,86 @@
+from event_store import LoginEventFactory
+from detection_rules import RuleEngine, SprayRule, ThresholdRule, SuccessAfterFailuresRule, \
+    NewPrivilegedSourceRule, RateRule, iter_chronological
+
+
+factory = LoginEventFactory()
+
+
+def event(second, event_id, ip, username):
+    minute, second = divmod(second, 60)
+    return factory.create(f"2024-01-01 08:{minute:02d}:{second:02d}", event_id, "", ip, username, "", "")
+
+
+def rules_found(findings, source):
+    return {finding.rule for finding in findings if finding.source == source}
+
+
+def test_threshold_levels():
+    logs = [event(i, 4625, "1.1.1.1", "admin") for i in range(20)]
+    logs += [event(i, 4625, "2.2.2.2", "admin") for i in range(5)]
+    logs += [event(i, 4625, "3.3.3.3", "admin") for i in range(4)]
+    findings = RuleEngine([ThresholdRule()]).run(logs)
+    assert [(f.source, f.risk) for f in findings] == [("1.1.1.1", "高危"), ("2.2.2.2", "警告")]
+
+
+def test_rate_rule_uses_time_window():
+    burst = [event(i, 4625, "1.1.1.1", "admin") for i in range(10)]
+    slow = [event(i * 120, 4625, "2.2.2.2", "admin") for i in range(10)]
+    findings = RuleEngine([RateRule()]).run(burst + slow)
+    assert [f.source for f in findings] == ["1.1.1.1"]
+
+
+def test_spray_requires_few_attempts_per_username():
+    spray = [event(i, 4625, "1.1.1.1", f"user{i}") for i in range(6)]
+    # 针对u0的定向爆破，虽然平均每个用户名不超过3次，但不是喷洒
+    targeted = [event(i, 4625, "2.2.2.2", "u0") for i in range(10)]
+    targeted += [event(20 + i, 4625, "2.2.2.2", f"other{i}") for i in range(5)]
+    findings = RuleEngine([SprayRule()]).run(spray + targeted)
+    assert [f.source for f in findings] == ["1.1.1.1"]
+
+
+def test_success_after_failures():
+    logs = [event(i, 4625, "1.1.1.1", "admin") for i in range(3)]
+    logs.append(event(10, 4624, "1.1.1.1", "admin"))
+    logs += [event(i, 4625, "2.2.2.2", "admin") for i in range(2)]
+    logs.append(event(10, 4624, "2.2.2.2", "admin"))
+    findings = RuleEngine([SuccessAfterFailuresRule()]).run(logs)
+    assert [(f.source, f.count) for f in findings] == [("1.1.1.1", 3)]
+
+
+def test_wrapped_log_order():
+    # 循环覆盖后较新的数据块排在较旧的数据块之前
+    newer = [event(3000 + i, 4625, "1.1.1.1", "admin") for i in range(3)]
+    newer.append(event(3010, 4624, "1.1.1.1", "admin"))
+    older = [event(i * 40, 4624, "2.2.2.2", "guest") for i in range(60)]
+    findings = RuleEngine([SuccessAfterFailuresRule()]).run(newer + older)
+    assert [f.source for f in findings] == ["1.1.1.1"]
+
+
+def test_unparseable_times_keep_their_position():
+    logs = [event(10, 4625, "1.1.1.1", "admin"),
+            factory.create("", 4625, "", "1.1.1.1", "admin", "", ""),
+            event(0, 4625, "1.1.1.1", "admin")]
+    assert list(iter_chronological(logs)) == [logs[2], logs[1], logs[0]]
+
+
+def test_new_privileged_source():
+    logs = [
+        event(0, 4624, "10.0.0.1", "admin"),
+        event(0, 4672, "-", "admin"),
+        event(10, 4624, "10.0.0.1", "admin"),
+        event(10, 4672, "-", "admin"),
+        event(20, 4624, "8.8.8.8", "admin"),
+        event(20, 4672, "-", "admin"),
+        event(30, 4672, "-", "SYSTEM"),
+    ]
+    findings = RuleEngine([NewPrivilegedSourceRule()]).run(logs)
+    assert [f.source for f in findings] == ["8.8.8.8"]
+
+
+def test_newest_first_logs_are_processed_chronologically():
+    logs = [event(i, 4625, "1.1.1.1", "admin") for i in range(3)]
+    logs.append(event(10, 4624, "1.1.1.1", "admin"))
+    logs.reverse()
+    findings = RuleEngine().run(logs)
+    assert "失败后登录成功" in rules_found(findings, "1.1.1.1")
@@ -0,0 +1,62 @@
+import pytest
+
+import enrichment
+from enrichment import SourceEnricher, classify_source
+
+
+@pytest.mark.parametrize("value, kind, scope", [
+    ("8.8.8.8", "IPv4", "公网"),
+    ("192.168.1.10", "IPv4", "内网"),
+    ("127.0.0.1", "IPv4", "本机"),
+    ("::ffff:10.0.0.5", "IPv4", "内网"),
+    ("::ffff:8.8.4.4", "IPv4", "公网"),
+    ("fe80::1%12", "IPv6", "链路本地"),
+    ("2001:4860:4860::8888", "IPv6", "公网"),
+    ("::1", "IPv6", "本机"),
+    ("-", "未知", ""),
+    ("未知", "未知", ""),
+    ("", "未知", ""),
+    ("WORKSTATION-01", "主机名", ""),
+    ("dead:beef", "主机名", ""),
+])
+def test_classify_source(value, kind, scope):
+    assert classify_source(value)[:2] == (kind, scope)
+
+
+def test_ipv4_mapped_address_is_normalized():
+    assert str(classify_source("::ffff:10.0.0.5")[2]) == "10.0.0.5"
+
+
+def test_enrich_many_deduplicates_and_caches():
+    enricher = SourceEnricher()
+    results = enricher.enrich_many(["8.8.8.8", "8.8.8.8", "10.0.0.1", "PC-01"])
+    assert set(results) == {"8.8.8.8", "10.0.0.1", "PC-01"}
+    assert results["10.0.0.1"].label() == "IPv4 内网"
+    assert enricher.cache_info().misses == 3
+
+    again = enricher.enrich_many(["8.8.8.8", "10.0.0.1"])
+    assert again["8.8.8.8"] is results["8.8.8.8"]
+    assert enricher.cache_info().misses == 3
+    assert enricher.cache_info().hits == 2
+
+
+def test_reverse_dns_only_for_new_public_sources(monkeypatch):
+    lookups = []
+
+    def gethostbyaddr(value):
+        lookups.append(value)
+        return ("dns.google", [], [value])
+
+    monkeypatch.setattr(enrichment.socket, "gethostbyaddr", gethostbyaddr)
+    enricher = SourceEnricher(reverse_dns=True)
+    results = enricher.enrich_many(["8.8.8.8", "8.8.8.8", "10.0.0.1"])
+    enricher.enrich_many(["8.8.8.8"])
+    assert lookups == ["8.8.8.8"]
+    assert results["8.8.8.8"].hostname == "dns.google"
+    assert results["10.0.0.1"].hostname is None
+
+
+def test_open_database_requires_maxminddb(monkeypatch):
+    monkeypatch.setattr(enrichment, "maxminddb", None)
+    with pytest.raises(RuntimeError):
+        SourceEnricher().open_database("GeoLite2-City.mmdb")
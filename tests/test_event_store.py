@@ -0,0 +1,53 @@
+import pytest
+
+from event_store import LoginEvent, LoginEventFactory, filter_events
+
+
+def test_login_event_supports_dict_access():
+    event = LoginEvent("2024-01-01 08:00:00", 4625, "登录失败", "1.1.1.1", "admin", "失败", "登录类型: 3")
+    assert event['IP地址'] == "1.1.1.1"
+    assert event['事件ID'] == 4625
+    assert event.get('详情', '') == "登录类型: 3"
+    assert event.get('不存在', '默认') == '默认'
+    assert list(event.keys()) == ['时间', '事件ID', '事件类型', 'IP地址', '用户名', '登录结果', '详情']
+    assert event.to_dict()['用户名'] == "admin"
+    with pytest.raises(KeyError):
+        event['不存在']
+
+
+def test_factory_shares_repeated_strings():
+    factory = LoginEventFactory()
+    # 每次都构造新的字符串对象，模拟逐条解析XML
+    events = [factory.create(f"2024-01-01 08:00:{i:02d}", 4625, "".join("登录失败"),
+                             "".join(["10.0.0.", str(i % 2)]), "".join(["user", str(i % 3)]),
+                             "".join("失败"), "".join("-"))
+              for i in range(12)]
+    assert events[0].ip_address is events[2].ip_address
+    assert events[0].username is events[3].username
+    assert events[0].event_type is events[1].event_type
+    assert factory.pool_sizes() == {'IP地址': 2, '用户名': 3, '主机名': 0, '标签': 3}
+
+    factory.clear()
+    assert factory.pool_sizes() == {'IP地址': 0, '用户名': 0, '主机名': 0, '标签': 0}
+
+
+def test_workstation_names_go_to_hostname_pool():
+    factory = LoginEventFactory()
+    factory.create("", 4625, "", "WORKSTATION-01", "admin", "", "")
+    factory.create("", 4625, "", "fe80::1%12", "admin", "", "")
+    # 看起来像IPv6但不是合法地址，与 classify_source 的判断一致
+    factory.create("", 4625, "", "dead:beef", "admin", "", "")
+    factory.create("", 4625, "", "WORKSTATION-01", "admin", "", "")
+    assert factory.pool_sizes()['主机名'] == 2
+    assert factory.pool_sizes()['IP地址'] == 1
+
+
+def test_filter_events():
+    factory = LoginEventFactory()
+    events = [factory.create("", 4625, "", "10.0.0.1", "Admin", "", ""),
+              factory.create("", 4624, "", "10.0.0.2", "guest", "", "")]
+    assert filter_events(events) is events
+    assert filter_events(events, event_id="4624") == [events[1]]
+    assert filter_events(events, ip_address="0.0.1", username="ADMIN") == [events[0]]
+    with pytest.raises(ValueError):
+        filter_events(events, event_id="abc")
@@ -0,0 +1,165 @@
+import struct
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+
+from evtx_recovery import EvtxRecoveryScanner, STATUS_OK, STATUS_DATA_CHECKSUM, STATUS_NO_MAGIC, \
+    STATUS_HEADER_CHECKSUM, STATUS_TRUNCATED
+
+BASE_TIME = datetime(2024, 1, 1)
+
+
+def filetime(value):
+    return int((value - datetime(1601, 1, 1)).total_seconds() * 10 ** 7)
+
+
+def build_record(record_num):
+    payload = b"\x0f\x01\x01\x00" + b"\x00" * 20
+    size = 24 + len(payload) + 4
+    timestamp = filetime(BASE_TIME + timedelta(hours=record_num))
+    return b"\x2a\x2a\x00\x00" + struct.pack("<IQQ", size, record_num, timestamp) + payload + struct.pack("<I", size)
+
+
+def build_chunk(first_record, count=2):
+    data = b"".join(build_record(first_record + i) for i in range(count))
+    chunk = bytearray(0x10000)
+    chunk[0x200:0x200 + len(data)] = data
+    next_record_offset = 0x200 + len(data)
+    last_record = first_record + count - 1
+
+    chunk[0:8] = b"ElfChnk\x00"
+    struct.pack_into("<QQQQIII", chunk, 8, first_record, last_record, first_record, last_record,
+                     0x80, 0x200 + len(data) - len(build_record(last_record)), next_record_offset)
+    struct.pack_into("<I", chunk, 0x34, zlib.crc32(bytes(chunk[0x200:next_record_offset])))
+    struct.pack_into("<I", chunk, 0x7C, zlib.crc32(bytes(chunk[0:0x78]) + bytes(chunk[0x80:0x200])))
+    return chunk
+
+
+def build_file_header(chunk_count):
+    header = bytearray(0x1000)
+    header[0:8] = b"ElfFile\x00"
+    struct.pack_into("<H", header, 0x2A, chunk_count)
+    struct.pack_into("<I", header, 0x7C, zlib.crc32(bytes(header[0:0x78])))
+    return header
+
+
+@pytest.fixture
+def damaged_file(tmp_path):
+    """正常数据块、数据校验失败的数据块、被覆盖了魔数的数据块，以及一个空的未分配数据块"""
+    valid = build_chunk(1)
+    corrupted = build_chunk(3)
+    corrupted[0x200 + 30] ^= 0xFF
+    overwritten = build_chunk(5)
+    overwritten[0:8] = b"XXXXXXXX"
+    bad_header = build_chunk(7)
+    bad_header[0x40] ^= 0xFF
+
+    path = tmp_path / "damaged.evtx"
+    path.write_bytes(bytes(build_file_header(4)) + bytes(valid) + bytes(corrupted)
+                     + bytes(overwritten) + bytes(bad_header) + bytes(0x10000))
+    return str(path)
+
+
+def test_scan_reports_chunk_statuses(damaged_file):
+    with EvtxRecoveryScanner(damaged_file) as scanner:
+        statuses = [status.status for status in scanner.scan()]
+        assert scanner.file_header_ok
+        assert scanner.header_chunk_count == 4
+    assert statuses == [STATUS_OK, STATUS_DATA_CHECKSUM, STATUS_NO_MAGIC, STATUS_HEADER_CHECKSUM, STATUS_NO_MAGIC]
+
+
+def test_records_are_recovered_and_deduplicated(damaged_file):
+    with EvtxRecoveryScanner(damaged_file) as scanner:
+        scanner.scan()
+        record_numbers = [record.record_num() for record in scanner.records()]
+        parsed = [status.parsed for status in scanner.chunks]
+        carved = [status.carved for status in scanner.chunks]
+    assert record_numbers == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert parsed == [2, 0, 0, 0, 0]
+    assert carved == [0, 2, 2, 2, 0]
+    assert scanner.duplicates == 0
+
+
+def test_duplicate_records_in_slack_space(tmp_path):
+    valid = build_chunk(1)
+    stale = build_record(2)
+    valid[0x8000:0x8000 + len(stale)] = stale
+    path = tmp_path / "slack.evtx"
+    path.write_bytes(bytes(build_file_header(1)) + bytes(valid))
+
+    with EvtxRecoveryScanner(str(path)) as scanner:
+        record_numbers = [record.record_num() for record in scanner.records()]
+        assert scanner.duplicates == 1
+    assert record_numbers == [1, 2]
+
+
+def string_cycle(chunk):
+    struct.pack_into("<I", chunk, 0x80, 0x1000)
+    struct.pack_into("<I", chunk, 0x1000, 0x1000)
+
+
+def string_out_of_chunk(chunk):
+    struct.pack_into("<I", chunk, 0x84, 0x20000)
+
+
+def template_cycle(chunk):
+    chunk[0x1000 - 10] = 0x0C
+    struct.pack_into("<I", chunk, 0x1000 - 4, 0x1000)
+    struct.pack_into("<I", chunk, 0x180, 0x1000)
+    struct.pack_into("<I", chunk, 0x1000, 0x1000)
+
+
+@pytest.mark.parametrize("corrupt", [string_cycle, string_out_of_chunk, template_cycle])
+def test_records_in_chunks_with_broken_tables_are_unreadable(tmp_path, corrupt):
+    broken = build_chunk(1)
+    corrupt(broken)
+    path = tmp_path / "tables.evtx"
+    path.write_bytes(bytes(build_file_header(1)) + bytes(broken))
+
+    with EvtxRecoveryScanner(str(path)) as scanner:
+        assert [status.status for status in scanner.scan()] == [STATUS_HEADER_CHECKSUM]
+        assert list(scanner.records()) == []
+        assert scanner.chunks[0].unreadable == 2
+
+
+def test_truncated_tail_is_scanned(tmp_path):
+    path = tmp_path / "truncated.evtx"
+    path.write_bytes(bytes(build_file_header(2)) + bytes(build_chunk(1)) + bytes(build_chunk(3)[:0x3000]))
+
+    with EvtxRecoveryScanner(str(path)) as scanner:
+        statuses = [status.status for status in scanner.scan()]
+        record_numbers = [record.record_num() for record in scanner.records()]
+        summary = scanner.summary()
+    assert statuses == [STATUS_OK, STATUS_TRUNCATED]
+    assert record_numbers == [1, 2, 3, 4]
+    assert scanner.truncated_bytes == 0x3000
+    assert "末尾 12288 字节不足一个数据块" in summary
+    assert "签名扫描恢复记录: 2 条" in summary
+
+
+def test_summary_counts(damaged_file):
+    with EvtxRecoveryScanner(damaged_file) as scanner:
+        scanner.scan()
+        records = list(scanner.records())
+        scanner.record_failed(records[0], ValueError("bad xml"))
+        scanner.record_failed(records[-1], ValueError("bad xml"))
+        summary = scanner.summary()
+    assert "文件头: 正常（声明 4 个数据块，实际扫描 5 个）" in summary
+    assert "正常解析记录: 1 条" in summary
+    assert "签名扫描恢复记录: 5 条" in summary
+    assert "无法解析记录: 2 条" in summary
+    assert "重复记录: 0 条" in summary
+
+
+def test_records_outside_time_range_are_counted_separately(damaged_file):
+    since = BASE_TIME + timedelta(hours=2)
+    until = BASE_TIME + timedelta(hours=5)
+    with EvtxRecoveryScanner(damaged_file) as scanner:
+        record_numbers = [record.record_num() for record in scanner.records(since, until)]
+        assert scanner.out_of_range == 4
+        summary = scanner.summary()
+    assert record_numbers == [2, 3, 4, 5]
+    assert "正常解析记录: 1 条" in summary
+    assert "签名扫描恢复记录: 3 条" in summary
+    assert "时间范围外记录: 4 条" in summary
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from event_store import LoginEventFactory
+from log_server import EventStoreService, LogServer, LogServerClient, ResultCache
+
+
+class BrokenEvent:
+    """导出时会出错的事件，用于模拟流式导出中途失败"""
+
+    def __getitem__(self, key):
+        return {'事件ID': 4625, 'IP地址': 'broken', '用户名': 'broken'}[key]
+
+    def get(self, key, default=None):
+        raise RuntimeError("broken event")
+
+
+def build_events(count=300):
+    factory = LoginEventFactory()
+    return [factory.create(f"2024-01-01 08:{i // 60 % 60:02d}:{i % 60:02d}", 4625 if i % 3 else 4624, "登录失败",
+                           f"10.0.0.{i % 7}", f"user{i % 11}", "失败", "") for i in range(count)]
+
+
+def start_server(events):
+    server = LogServer(EventStoreService(events, ['test']), '127.0.0.1', 0)
+    thread = threading.Thread(target=lambda: asyncio.run(server.serve_forever()), daemon=True)
+    thread.start()
+    for _ in range(100):
+        if server.port:
+            break
+        time.sleep(0.05)
+    return server
+
+
+@pytest.fixture(scope="module")
+def server():
+    return start_server(build_events())
+
+
+def get(server, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{server.port}{path}", timeout=10) as response:
+        return response.status, response.read().decode('utf-8')
+
+
+def raw_request(server, data):
+    with socket.create_connection(('127.0.0.1', server.port), timeout=10) as sock:
+        sock.sendall(data)
+        chunks = []
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def test_events_are_filtered_and_paginated(server):
+    status, body = get(server, "/events?event_id=4624&ip=10.0.0.1&offset=5&limit=10")
+    page = json.loads(body)
+    expected = [e for e in build_events() if e['事件ID'] == 4624 and '10.0.0.1' in e['IP地址']]
+    assert status == 200
+    assert page['total'] == len(expected)
+    assert [e['时间'] for e in page['events']] == [e['时间'] for e in expected[5:15]]
+
+
+def test_client_fetches_a_single_page(server):
+    client = LogServerClient(f"http://127.0.0.1:{server.port}")
+    page = client.events_page(event_id="4625", offset=3, limit=4)
+    expected = [e for e in build_events() if e['事件ID'] == 4625]
+    assert page['total'] == len(expected)
+    assert [e['时间'] for e in page['events']] == [e['时间'] for e in expected[3:7]]
+
+
+def test_export_streams_csv(server):
+    status, body = get(server, "/export?username=USER1")
+    lines = body.strip().splitlines()
+    expected = [e for e in build_events() if 'user1' in e['用户名']]
+    assert status == 200
+    assert lines[0] == "时间,事件ID,事件类型,IP地址,用户名,登录结果,详细信息"
+    assert len(lines) == len(expected) + 1
+
+
+@pytest.mark.parametrize("path, status", [
+    ("/events?event_id=abc", 400),
+    ("/events?limit=abc", 400),
+    ("/export?event_id=abc", 400),
+    ("/unknown", 404),
+])
+def test_error_responses(server, path, status):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        get(server, path)
+    assert error.value.code == status
+    assert "error" in json.loads(error.value.read().decode('utf-8'))
+
+
+def test_malformed_request_gets_400(server):
+    response = raw_request(server, b"GARBAGE\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 400")
+
+
+def test_empty_connection_is_not_counted():
+    server = start_server(build_events(10))
+    socket.create_connection(('127.0.0.1', server.port), timeout=10).close()
+    time.sleep(0.2)
+    assert server.metrics.routes == {}
+
+
+def test_export_failure_does_not_append_second_response():
+    server = start_server(build_events(10) + [BrokenEvent()])
+    response = raw_request(server, b"GET /export HTTP/1.1\r\nHost: test\r\n\r\n")
+    assert response.startswith(b"HTTP/1.1 200")
+    assert response.count(b"HTTP/1.1") == 1
+    assert not response.endswith(b"0\r\n\r\n")
+    assert server.metrics.routes['/export']['errors'] == 1
+
+
+def test_result_cache_is_bounded_by_rows():
+    cache = ResultCache(max_rows=10)
+    cache.put('a', [1] * 6)
+    cache.put('b', [1] * 4)
+    cache.put('c', [1] * 3)
+    assert cache.get('a') is None
+    assert cache.get('b') is not None and cache.get('c') is not None
+    assert cache.total_rows == 7
+    cache.put('huge', [1] * 11)
+    assert cache.get('huge') is None
+    assert cache.total_rows == 7
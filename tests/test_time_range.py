@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import evtx_reader
+from evtx_reader import iter_evtx_records_in_range, probe_chunk_time_range
+
+
+class FakeRecord:
+    def __init__(self, timestamp):
+        self._timestamp = timestamp
+
+    def timestamp(self):
+        return self._timestamp
+
+
+class FakeChunk:
+    def __init__(self, timestamps):
+        self._records = [FakeRecord(t) for t in timestamps]
+        self._buf = None
+
+    def offset(self):
+        return 0
+
+    def last_record_offset(self):
+        return len(self._records) - 1
+
+    def first_record(self):
+        return self._records[0]
+
+    def records(self):
+        return iter(self._records)
+
+
+class FakeLog:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def chunks(self):
+        return iter(self._chunks)
+
+
+def fake_record_at(buf, offset, chunk):
+    return chunk._records[offset]
+
+
+def test_zero_timestamp_chunk_is_treated_as_boundary(monkeypatch):
+    monkeypatch.setattr(evtx_reader, "Record", fake_record_at)
+    base = datetime(2024, 1, 1, 8)
+    chunk = FakeChunk([datetime.min, base, base + timedelta(hours=2)])
+    assert probe_chunk_time_range(chunk) is None
+
+    stats = {}
+    records = list(iter_evtx_records_in_range(FakeLog([chunk]), base - timedelta(minutes=1),
+                                              base + timedelta(hours=1), stats))
+    assert [r.timestamp() for r in records] == [base]
+    assert stats == {'chunks': 1, 'skipped_chunks': 0, 'boundary_chunks': 1}
+
+
+def test_chunks_outside_range_are_skipped(monkeypatch):
+    monkeypatch.setattr(evtx_reader, "Record", fake_record_at)
+    base = datetime(2024, 1, 1, 8)
+    old = FakeChunk([base - timedelta(days=2), base - timedelta(days=1)])
+    inside = FakeChunk([base + timedelta(minutes=10), base + timedelta(minutes=20)])
+    new = FakeChunk([base + timedelta(days=1), base + timedelta(days=2)])
+
+    stats = {}
+    records = list(iter_evtx_records_in_range(FakeLog([old, inside, new]), base, base + timedelta(hours=1), stats))
+    assert len(records) == 2
+    assert stats == {'chunks': 3, 'skipped_chunks': 2, 'boundary_chunks': 0}
+
+
+def test_extreme_timestamps_do_not_overflow(monkeypatch):
+    monkeypatch.setattr(evtx_reader, "Record", fake_record_at)
+    chunk = FakeChunk([datetime.min + timedelta(seconds=1), datetime.max])
+    records = list(iter_evtx_records_in_range(FakeLog([chunk]), datetime(2024, 1, 1), None))
+    assert len(records) == 1
@@ -1,17 +1,26 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import pandas as pd
 import win32evtlog
 import win32evtlogutil
 import win32con
 import os
+import argparse
 from datetime import datetime
 import csv
 import re
-from collections import defaultdict
-import xml.etree.ElementTree as ET
-from Evtx.Evtx import Evtx
+import queue
+import threading
 from Evtx.Views import evtx_record_xml_view
+from event_store import LoginEventFactory, filter_events
+from evtx_reader import parse_time_bound, load_evtx_events, parse_evtx_record
+from detection_rules import RuleEngine
+from enrichment import SourceEnricher
+from evtx_recovery import EvtxRecoveryScanner
+from log_server import LogServerClient, DEFAULT_PORT
+
+# 瘦客户端模式下每页显示的日志条数
+SERVER_PAGE_SIZE = 500
 
 class RoundedButton(tk.Canvas):
     def __init__(self, parent, text, command=None, width=120, height=35, corner_radius=10, padding=2, bg="#f0f0f0", fg="#333333", hover_bg="#4a90e2", hover_fg="#ffffff"):
@@ -108,6 +117,22 @@ class LogAnalyzer:
         
         # 存储当前日志数据
         self.current_logs = []
+        # 日志事件工厂（共享IP、用户名等字符串池）
+        self.event_factory = LoginEventFactory()
+        # 来源IP归属查询（离线GeoIP/ASN数据库）
+        self.enricher = SourceEnricher()
+        # 连接查询服务后作为瘦客户端使用，None表示使用本地数据
+        self.server_client = None
+        # 瘦客户端模式下当前的筛选条件、分页位置和结果总数
+        self.server_filters = ("", "", "")
+        self.page_offset = 0
+        self.page_total = 0
+        # 用于丢弃过期的分页响应
+        self.page_request = 0
+        
+        # 后台线程的结果通过队列交回界面线程处理
+        self.ui_queue = queue.Queue()
+        self.root.after(100, self.process_ui_queue)
         # 存储爆破检测结果
         self.brute_force_results = []
         
@@ -185,14 +210,33 @@ class LogAnalyzer:
         # 创建圆角按钮
         RoundedButton(toolbar, "分析本地日志", command=self.analyze_local_logs).pack(side=tk.LEFT, padx=5)
         RoundedButton(toolbar, "导入事件日志", command=self.import_evtx_file).pack(side=tk.LEFT, padx=5)
+        RoundedButton(toolbar, "修复导入", command=self.recover_evtx_file).pack(side=tk.LEFT, padx=5)
         RoundedButton(toolbar, "导出日志", command=self.export_logs).pack(side=tk.LEFT, padx=5)
         RoundedButton(toolbar, "检测爆破", command=self.detect_brute_force).pack(side=tk.LEFT, padx=5)
+        RoundedButton(toolbar, "加载IP库", command=self.load_geoip_database).pack(side=tk.LEFT, padx=5)
+        RoundedButton(toolbar, "连接服务", command=self.connect_server).pack(side=tk.LEFT, padx=5)
         
         # 添加一键清空按钮（使用红色突出显示）
         clear_button = RoundedButton(toolbar, "一键清空", command=self.clear_all, 
                                    bg="#ff4d4d", fg="#ffffff", 
                                    hover_bg="#ff1a1a", hover_fg="#ffffff")
         clear_button.pack(side=tk.RIGHT, padx=5)
+        
+        # 导入时间范围（只导入该时间段内的记录）
+        range_frame = ttk.Frame(self.main_frame, style='Main.TFrame')
+        range_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(range_frame, text="导入时间范围  起始:", style='Blue.TLabel').pack(side=tk.LEFT, padx=(5, 2))
+        self.since_var = tk.StringVar()
+        ttk.Entry(range_frame, textvariable=self.since_var,
+                  style='Blue.TEntry', width=20).pack(side=tk.LEFT, padx=(2, 10))
+        ttk.Label(range_frame, text="结束:", style='Blue.TLabel').pack(side=tk.LEFT)
+        self.until_var = tk.StringVar()
+        ttk.Entry(range_frame, textvariable=self.until_var,
+                  style='Blue.TEntry', width=20).pack(side=tk.LEFT, padx=(2, 10))
+        ttk.Label(range_frame,
+                  text="格式: 2024-01-01 08:00:00 或 48h / 7d（留空表示不限）",
+                  style='Blue.TLabel',
+                  font=('Microsoft YaHei UI', 9)).pack(side=tk.LEFT, padx=5)
 
     def create_log_display(self):
         # 创建日志显示区域
@@ -221,7 +265,7 @@ class LogAnalyzer:
         brute_frame.pack(fill=tk.X, pady=5)
         
         # 创建Treeview
-        columns = ("IP地址", "失败次数", "时间范围", "风险等级", "尝试的用户名", "目标用户名")
+        columns = ("IP地址", "来源信息", "失败次数", "时间范围", "风险等级", "尝试的用户名", "目标用户名", "检测规则")
         self.brute_tree = ttk.Treeview(brute_frame, columns=columns, show="headings", style='Blue.Treeview')
         
         # 设置列标题和固定宽度
@@ -238,11 +282,12 @@ class LogAnalyzer:
         
         # 添加说明标签
         info_label = ttk.Label(brute_frame,
-                             text="提示：系统会自动分析登录失败事件，识别可能的暴力破解攻击。\n"
-                                  "风险等级说明：\n"
-                                  "- 警告：5-9次失败登录\n"
-                                  "- 可疑：10-19次失败登录\n"
-                                  "- 高危：20次以上失败登录",
+                             text="提示：系统会自动分析登录事件，识别可能的暴力破解攻击。\n"
+                                  "失败次数阈值：5-9次为警告，10-19次为可疑，20次以上为高危\n"
+                                  "高频失败：1分钟内失败10次以上\n"
+                                  "密码喷洒：同一IP尝试5个以上用户名，每个用户名不超过3次\n"
+                                  "失败后登录成功：连续失败3次以上后登录成功\n"
+                                  "新来源特权登录：账户的特权登录来自此前未出现过的来源",
                              style='Blue.TLabel',
                              font=('Microsoft YaHei UI', 9))
         info_label.pack(pady=5)
@@ -336,7 +381,9 @@ class LogAnalyzer:
             flags = win32evtlog.EVENTLOG_BACKWARDS_READ | win32evtlog.EVENTLOG_SEQUENTIAL_READ
             
             # 清空现有数据
+            self.server_client = None
             self.current_logs = []
+            self.event_factory.clear()
             
             # 读取事件
             while True:
@@ -351,15 +398,15 @@ class LogAnalyzer:
                         ip_address, username, login_result, details = self.extract_login_info(event_id, event.StringInserts)
                         
                         # 添加日志条目
-                        self.current_logs.append({
-                            "时间": event.TimeGenerated.Format(),
-                            "事件ID": event_id,
-                            "事件类型": self.security_events[event_id],
-                            "IP地址": ip_address,
-                            "用户名": username,
-                            "登录结果": login_result,
-                            "详情": details
-                        })
+                        self.current_logs.append(self.event_factory.create(
+                            event.TimeGenerated.Format(),
+                            event_id,
+                            self.security_events[event_id],
+                            ip_address,
+                            username,
+                            login_result,
+                            details
+                        ))
             
             # 关闭日志
             win32evtlog.CloseEventLog(log)
@@ -375,73 +422,166 @@ class LogAnalyzer:
         # 清空爆破检测结果
         for item in self.brute_tree.get_children():
             self.brute_tree.delete(item)
+        
+        # 已连接查询服务时在后台获取服务端的检测结果
+        if self.server_client is not None:
+            self.run_in_background(self.server_client.brute_force,
+                                   self.show_server_brute_force,
+                                   lambda e: messagebox.showerror("错误", f"从服务获取检测结果时发生错误:\n{str(e)}"))
+            return
+        
+        # 所有检测规则在一次遍历中同时运行
+        engine = RuleEngine()
+        findings = self.brute_force_results = engine.run(self.current_logs)
+        
+        # 如果没有检测到爆破行为
+        if not findings:
+            messagebox.showinfo("提示", "未检测到可能的暴力破解攻击")
+            return
+        
+        # 批量查询来源信息（每个不同的IP只查询一次），开启反向DNS时可能较慢，在后台执行
+        self.run_in_background(lambda: self.enricher.enrich_many(finding.source for finding in findings),
+                               lambda sources: self.show_brute_force_findings(findings, sources),
+                               lambda e: messagebox.showerror("错误", f"查询来源信息时发生错误:\n{str(e)}"))
+            
+    def show_brute_force_findings(self, findings, sources):
+        """显示本地检测结果及来源信息"""
+        # 查询期间又重新检测或清空了数据时忽略这次结果
+        if findings is not self.brute_force_results:
+            return
+        for item in self.brute_tree.get_children():
+            self.brute_tree.delete(item)
+        for finding in findings:
+            values = finding.values()
+            self.brute_tree.insert('', 'end', values=(values[0], sources[finding.source].label()) + values[1:])
             
-        # 统计每个IP的失败登录信息
-        ip_failures = defaultdict(lambda: {
-            'count': 0,
-            'usernames': set(),
-            'times': [],
-            'last_time': None,
-            'first_time': None,
-            'target_usernames': set()
-        })
-        
-        # 分析日志数据
-        for log in self.current_logs:
-            if log['事件ID'] == 4625:  # 失败登录
-                ip = log['IP地址']
-                username = log['用户名']
-                time_str = log['时间']
+    def show_server_brute_force(self, rows):
+        """显示服务端返回的爆破检测结果"""
+        self.brute_force_results = rows
+        for item in self.brute_tree.get_children():
+            self.brute_tree.delete(item)
+        for row in rows:
+            self.brute_tree.insert('', 'end', values=row)
+        if not rows:
+            messagebox.showinfo("提示", "未检测到可能的暴力破解攻击")
+            
+    def run_in_background(self, task, on_success, on_error):
+        """在后台线程中执行耗时操作（如HTTP请求），结果交回界面线程处理"""
+        def worker():
+            try:
+                result = task()
+            except Exception as e:
+                self.ui_queue.put((on_error, e))
+            else:
+                self.ui_queue.put((on_success, result))
+        threading.Thread(target=worker, daemon=True).start()
+        
+    def process_ui_queue(self):
+        """在界面线程中执行后台任务的回调
+
+        单个回调出错（如服务返回了意外的数据）只提示错误，不影响之后的回调
+        """
+        try:
+            while True:
+                try:
+                    callback, value = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    callback(value)
+                except Exception as e:
+                    messagebox.showerror("错误", f"处理后台任务结果时发生错误:\n{str(e)}")
+        finally:
+            self.root.after(100, self.process_ui_queue)
+            
+    def connect_server(self):
+        """连接本地查询服务，之后筛选、爆破检测和导出都由服务完成"""
+        base_url = simpledialog.askstring("连接服务", "查询服务地址:",
+                                          initialvalue=f"http://127.0.0.1:{DEFAULT_PORT}",
+                                          parent=self.root)
+        if base_url:
+            self.use_server(base_url)
+            
+    def use_server(self, base_url):
+        client = LogServerClient(base_url)
+        
+        def on_connected(status):
+            self.server_client = client
+            self.current_logs = []
+            self.apply_filters()
+            messagebox.showinfo("成功", f"已连接查询服务，共 {status['events']} 条日志记录")
+        
+        self.run_in_background(client.status, on_connected,
+                               lambda e: messagebox.showerror("错误", f"连接查询服务时发生错误:\n{str(e)}"))
+            
+    def load_geoip_database(self):
+        """加载离线GeoIP/ASN数据库文件"""
+        file_paths = filedialog.askopenfilenames(
+            title="选择GeoIP/ASN数据库文件",
+            filetypes=[
+                ("MaxMind数据库", "*.mmdb"),
+                ("所有文件", "*.*")
+            ]
+        )
+        
+        if file_paths:
+            try:
+                for file_path in file_paths:
+                    self.enricher.open_database(file_path)
+                messagebox.showinfo("成功", f"已加载 {len(file_paths)} 个IP数据库")
+            except Exception as e:
+                messagebox.showerror("错误", f"加载IP数据库时发生错误:\n{str(e)}")
+            
+    def import_evtx_file(self):
+        """导入EVTX文件"""
+        file_path = filedialog.askopenfilename(
+            title="选择事件日志文件",
+            filetypes=[
+                ("事件日志文件", "*.evtx"),
+                ("所有文件", "*.*")
+            ]
+        )
+        
+        if file_path:
+            # 解析导入时间范围
+            try:
+                since = parse_time_bound(self.since_var.get())
+                until = parse_time_bound(self.until_var.get())
+            except ValueError as e:
+                messagebox.showwarning("警告", str(e))
+                return
+            
+            try:
+                # 清空现有数据
+                self.server_client = None
+                self.current_logs = []
+                self.event_factory.clear()
+                chunk_stats = {}
                 
-                # 更新时间信息
-                if ip_failures[ip]['first_time'] is None:
-                    ip_failures[ip]['first_time'] = time_str
-                ip_failures[ip]['last_time'] = time_str
+                # 读取EVTX文件，跳过时间范围之外的数据块
+                self.current_logs = load_evtx_events(file_path, self.event_factory, since, until, chunk_stats)
                 
-                # 更新统计信息
-                ip_failures[ip]['count'] += 1
-                ip_failures[ip]['usernames'].add(username)
+                # 更新显示
+                self.update_log_display()
                 
-                # 记录目标用户名（如果用户名不是常见系统账户）
-                if username.lower() not in ['system', 'administrator', 'guest', 'defaultaccount']:
-                    ip_failures[ip]['target_usernames'].add(username)
-        
-        # 分析可能的爆破行为
-        for ip, data in ip_failures.items():
-            if data['count'] >= 5:  # 如果同一IP有5次或更多失败登录
-                # 计算时间范围
-                time_range = f"{data['first_time']} 至 {data['last_time']}"
+                range_info = ""
+                if since is not None or until is not None:
+                    range_info = (f"\n共 {chunk_stats['chunks']} 个数据块，"
+                                  f"跳过 {chunk_stats['skipped_chunks']} 个，"
+                                  f"边界块 {chunk_stats['boundary_chunks']} 个")
                 
-                # 确定风险等级
-                if data['count'] >= 20:
-                    status = "高危"
-                elif data['count'] >= 10:
-                    status = "可疑"
+                if not self.current_logs:
+                    messagebox.showwarning("警告", "未找到相关的登录事件记录" + range_info)
                 else:
-                    status = "警告"
-                
-                # 获取尝试的用户名列表
-                usernames = ", ".join(data['usernames'])
-                target_usernames = ", ".join(data['target_usernames'])
-                
-                # 添加检测结果
-                self.brute_tree.insert('', 'end', values=(
-                    ip,
-                    data['count'],
-                    time_range,
-                    status,
-                    usernames,
-                    target_usernames
-                ))
+                    messagebox.showinfo("成功", f"成功导入 {len(self.current_logs)} 条日志记录" + range_info)
                 
-        # 如果没有检测到爆破行为
-        if not self.brute_tree.get_children():
-            messagebox.showinfo("提示", "未检测到可能的暴力破解攻击")
-            
-    def import_evtx_file(self):
-        """导入EVTX文件"""
+            except Exception as e:
+                messagebox.showerror("错误", f"导入文件时发生错误:\n{str(e)}")
+
+    def recover_evtx_file(self):
+        """校验EVTX文件并从损坏的数据块和未分配空间中恢复记录"""
         file_path = filedialog.askopenfilename(
-            title="选择事件日志文件",
+            title="选择需要修复的事件日志文件",
             filetypes=[
                 ("事件日志文件", "*.evtx"),
                 ("所有文件", "*.*")
@@ -449,103 +589,52 @@ class LogAnalyzer:
         )
         
         if file_path:
+            # 解析导入时间范围
+            try:
+                since = parse_time_bound(self.since_var.get())
+                until = parse_time_bound(self.until_var.get())
+            except ValueError as e:
+                messagebox.showwarning("警告", str(e))
+                return
+            
             try:
                 # 清空现有数据
+                self.server_client = None
                 self.current_logs = []
+                self.event_factory.clear()
                 
-                # 读取EVTX文件
-                with Evtx(file_path) as log:
-                    for record in log.records():
+                with EvtxRecoveryScanner(file_path) as scanner:
+                    # 第一遍：校验数据块并扫描候选记录
+                    scanner.scan()
+                    
+                    for record in scanner.records(since, until):
                         try:
-                            # 解析XML内容
-                            xml_content = record.xml()
-                            event = ET.fromstring(xml_content)
-                            
-                            # 获取System节点
-                            system = event.find('.//{http://schemas.microsoft.com/win/2004/08/events/event}System')
-                            if system is None:
-                                continue
-                                
-                            # 获取事件ID
-                            event_id_elem = system.find('.//{http://schemas.microsoft.com/win/2004/08/events/event}EventID')
-                            if event_id_elem is None:
-                                continue
-                            
-                            event_id = int(event_id_elem.text)
-                            
-                            # 只处理我们关注的事件ID
-                            if event_id in self.security_events:
-                                # 获取时间
-                                time_created = system.find('.//{http://schemas.microsoft.com/win/2004/08/events/event}TimeCreated')
-                                event_time = time_created.get('SystemTime') if time_created is not None else ''
-                                
-                                # 获取EventData节点
-                                event_data = event.find('.//{http://schemas.microsoft.com/win/2004/08/events/event}EventData')
-                                if event_data is None:
-                                    continue
-                                
-                                # 解析事件数据
-                                data = {}
-                                for data_item in event_data.findall('.//{http://schemas.microsoft.com/win/2004/08/events/event}Data'):
-                                    name = data_item.get('Name')
-                                    if name:
-                                        data[name] = data_item.text if data_item.text else ''
-                                
-                                # 根据事件ID提取相关信息
-                                if event_id == 4624:  # 登录成功
-                                    ip_address = data.get('IpAddress', data.get('WorkstationName', '未知'))
-                                    username = data.get('TargetUserName', '未知')
-                                    logon_type = data.get('LogonType', '未知')
-                                    details = f"登录类型: {logon_type}, 进程: {data.get('ProcessName', '未知')}"
-                                    login_result = '成功'
-                                    
-                                elif event_id == 4625:  # 登录失败
-                                    ip_address = data.get('IpAddress', data.get('WorkstationName', '未知'))
-                                    username = data.get('TargetUserName', '未知')
-                                    sub_status = data.get('SubStatus', '未知')
-                                    details = f"失败原因: {sub_status}, 登录类型: {data.get('LogonType', '未知')}"
-                                    login_result = '失败'
-                                    
-                                elif event_id == 4648:  # 使用明文凭据尝试登录
-                                    ip_address = data.get('TargetServerName', '未知')
-                                    username = data.get('TargetUserName', '未知')
-                                    details = f"进程: {data.get('ProcessName', '未知')}"
-                                    login_result = '明文尝试'
-                                    
-                                elif event_id == 4672:  # 特权登录
-                                    ip_address = data.get('WorkstationName', '未知')
-                                    username = data.get('SubjectUserName', '未知')
-                                    details = f"特权: {data.get('PrivilegeList', '未知')}"
-                                    login_result = '特权登录'
-                                
-                                # 添加日志条目
-                                log_entry = {
-                                    '时间': event_time,
-                                    '事件ID': event_id,
-                                    '事件类型': self.security_events[event_id],
-                                    'IP地址': ip_address,
-                                    '用户名': username,
-                                    '登录结果': login_result,
-                                    '详情': details
-                                }
+                            log_entry = self.parse_evtx_record(record)
+                            if log_entry is not None:
                                 self.current_logs.append(log_entry)
-                        
                         except Exception as e:
-                            print(f"跳过无效记录: {e}")
-                            continue
+                            scanner.record_failed(record, e)
+                    
+                    report = scanner.summary()
                 
                 # 更新显示
                 self.update_log_display()
                 
-                if not self.current_logs:
-                    messagebox.showwarning("警告", "未找到相关的登录事件记录")
-                else:
-                    messagebox.showinfo("成功", f"成功导入 {len(self.current_logs)} 条日志记录")
+                messagebox.showinfo("修复导入完成",
+                                    f"导入 {len(self.current_logs)} 条日志记录\n\n{report}")
                 
             except Exception as e:
-                messagebox.showerror("错误", f"导入文件时发生错误:\n{str(e)}")
+                messagebox.showerror("错误", f"修复导入时发生错误:\n{str(e)}")
+
+    def parse_evtx_record(self, record):
+        """解析单条EVTX记录，不是关注的事件时返回None"""
+        return parse_evtx_record(record, self.event_factory, self.security_events)
 
     def export_logs(self):
+        if self.server_client is not None:
+            self.export_logs_from_server()
+            return
+        
         if not self.current_logs:
             messagebox.showwarning("警告", "没有可导出的日志数据")
             return
@@ -582,6 +671,20 @@ class LogAnalyzer:
             except Exception as e:
                 messagebox.showerror("错误", f"导出日志时发生错误: {str(e)}")
                 
+    def export_logs_from_server(self):
+        """由查询服务流式导出全部日志"""
+        file_path = filedialog.asksaveasfilename(
+            title="导出日志",
+            filetypes=[("CSV文件", "*.csv")],
+            defaultextension=".csv"
+        )
+        
+        if file_path:
+            client = self.server_client
+            self.run_in_background(lambda: client.export(file_path),
+                                   lambda result: messagebox.showinfo("成功", "日志导出成功"),
+                                   lambda e: messagebox.showerror("错误", f"导出日志时发生错误: {str(e)}"))
+                
     def clear_log_display(self):
         for item in self.tree.get_children():
             self.tree.delete(item)
@@ -655,6 +758,22 @@ class LogAnalyzer:
                      height=30,
                      command=self.reset_filters).pack(side=tk.LEFT, padx=5)
         
+        # 瘦客户端模式下的分页控制
+        page_frame = ttk.Frame(filter_frame, style='Main.TFrame')
+        page_frame.pack(fill=tk.X, pady=(5, 0))
+        RoundedButton(page_frame,
+                     text="上一页",
+                     width=80,
+                     height=30,
+                     command=self.previous_page).pack(side=tk.LEFT, padx=5)
+        RoundedButton(page_frame,
+                     text="下一页",
+                     width=80,
+                     height=30,
+                     command=self.next_page).pack(side=tk.LEFT, padx=5)
+        self.page_var = tk.StringVar()
+        ttk.Label(page_frame, textvariable=self.page_var, style='Blue.TLabel').pack(side=tk.LEFT, padx=10)
+        
         # 创建事件类型快速筛选区域
         event_filter_frame = ttk.Frame(filter_frame, style='Main.TFrame')
         event_filter_frame.pack(fill=tk.X, pady=(5, 0))
@@ -700,26 +819,30 @@ class LogAnalyzer:
         ip_address = self.ip_var.get().strip()
         username = self.username_var.get().strip()
         
+        # 已连接查询服务时由服务筛选，只获取第一页
+        if self.server_client is not None:
+            try:
+                int(event_id or 0)
+            except ValueError:
+                messagebox.showwarning("警告", "事件ID必须是数字")
+                return
+            self.server_filters = (event_id, ip_address, username)
+            self.page_offset = 0
+            self.load_server_page()
+            return
+        
         # 清空现有显示
         for item in self.tree.get_children():
             self.tree.delete(item)
+        self.page_var.set("")
         
         # 应用筛选条件
-        filtered_logs = self.current_logs if hasattr(self, 'current_logs') else []
-        
-        if event_id:
-            try:
-                event_id = int(event_id)
-                filtered_logs = [log for log in filtered_logs if log['事件ID'] == event_id]
-            except ValueError:
-                messagebox.showwarning("警告", "事件ID必须是数字")
-                return
-                
-        if ip_address:
-            filtered_logs = [log for log in filtered_logs if ip_address.lower() in log['IP地址'].lower()]
-            
-        if username:
-            filtered_logs = [log for log in filtered_logs if username.lower() in log['用户名'].lower()]
+        try:
+            filtered_logs = filter_events(self.current_logs if hasattr(self, 'current_logs') else [],
+                                          event_id, ip_address, username)
+        except ValueError:
+            messagebox.showwarning("警告", "事件ID必须是数字")
+            return
         
         # 显示筛选后的日志
         for log in filtered_logs:
@@ -737,12 +860,67 @@ class LogAnalyzer:
         if not filtered_logs:
             messagebox.showinfo("提示", "没有找到匹配的日志记录")
 
+    def load_server_page(self):
+        """在后台从查询服务获取当前页"""
+        client = self.server_client
+        event_id, ip_address, username = self.server_filters
+        offset = self.page_offset
+        self.page_request += 1
+        request = self.page_request
+        self.page_var.set("正在加载……")
+        
+        def on_loaded(page):
+            # 忽略已过期的响应（之后又发起了新的查询或已断开服务）
+            if request == self.page_request and client is self.server_client:
+                self.show_server_page(page)
+        
+        self.run_in_background(
+            lambda: client.events_page(event_id, ip_address, username, offset, SERVER_PAGE_SIZE),
+            on_loaded,
+            lambda e: messagebox.showerror("错误", f"从服务查询日志时发生错误:\n{str(e)}"))
+
+    def show_server_page(self, page):
+        """显示查询服务返回的一页日志"""
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        
+        for log in page['events']:
+            self.tree.insert('', 'end', values=(
+                log['时间'],
+                log['事件ID'],
+                log['事件类型'],
+                log['IP地址'],
+                log['用户名'],
+                log['登录结果'],
+                log['详情']
+            ))
+        
+        self.page_total = page['total']
+        page_count = max(1, (self.page_total + SERVER_PAGE_SIZE - 1) // SERVER_PAGE_SIZE)
+        self.page_var.set(f"第 {self.page_offset // SERVER_PAGE_SIZE + 1}/{page_count} 页，共 {self.page_total} 条")
+        
+        if not self.page_total:
+            messagebox.showinfo("提示", "没有找到匹配的日志记录")
+
+    def previous_page(self):
+        """瘦客户端模式下显示上一页"""
+        if self.server_client is not None and self.page_offset > 0:
+            self.page_offset = max(self.page_offset - SERVER_PAGE_SIZE, 0)
+            self.load_server_page()
+
+    def next_page(self):
+        """瘦客户端模式下显示下一页"""
+        if self.server_client is not None and self.page_offset + SERVER_PAGE_SIZE < self.page_total:
+            self.page_offset += SERVER_PAGE_SIZE
+            self.load_server_page()
+
     def update_log_display(self):
         """更新日志显示"""
         try:
             # 清空现有显示
             for item in self.tree.get_children():
                 self.tree.delete(item)
+            self.page_var.set("")
             
             # 添加新的日志条目
             for log in self.current_logs:
@@ -770,13 +948,16 @@ class LogAnalyzer:
                 self.brute_tree.delete(item)
             
             # 清空数据
+            self.server_client = None
             self.current_logs = []
+            self.event_factory.clear()
             self.brute_force_results = []
             
             # 清空筛选条件
             self.event_id_var.set("")
             self.ip_var.set("")
             self.username_var.set("")
+            self.page_var.set("")
             
             messagebox.showinfo("成功", "已清空所有数据和显示")
             
@@ -784,6 +965,21 @@ class LogAnalyzer:
             messagebox.showerror("错误", f"清空数据时发生错误: {str(e)}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Windows日志分析工具")
+    parser.add_argument("--since", default="", help="导入起始时间，如 \"2024-01-01 08:00:00\" 或 48h")
+    parser.add_argument("--until", default="", help="导入结束时间，格式同 --since")
+    parser.add_argument("--geoip-db", action="append", default=[], help="离线GeoIP/ASN数据库（.mmdb），可指定多次")
+    parser.add_argument("--reverse-dns", action="store_true", help="对公网来源进行反向DNS查询")
+    parser.add_argument("--server", default="", help="作为瘦客户端连接本地查询服务，如 http://127.0.0.1:8765")
+    args = parser.parse_args()
+    
     root = tk.Tk()
     app = LogAnalyzer(root)
+    app.since_var.set(args.since)
+    app.until_var.set(args.until)
+    app.enricher.reverse_dns = args.reverse_dns
+    for db_path in args.geoip_db:
+        app.enricher.open_database(db_path)
+    if args.server:
+        app.use_server(args.server)
     root.mainloop() 
\ No newline at end of file